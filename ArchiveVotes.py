@@ -0,0 +1,26 @@
+"""
+ArchiveVotes: appends every saved vote in ./votes to the binary roll-call archive (see VoteArchive).
+Votes already archived are skipped, so this can be re-run at any time to catch up.
+"""
+
+from FiveThreeFive import Vote, VoteArchive, CURRENT_CONGRESS
+import os
+
+VOTE_DIRECTORY = './votes'
+
+
+def main():
+    added = 0
+    for file_name in sorted(os.listdir(VOTE_DIRECTORY)):
+        if not file_name.endswith('.json'):
+            continue
+        vote = Vote(file_path=os.path.join(VOTE_DIRECTORY, file_name))
+        archive = VoteArchive.shared(getattr(vote, 'congress', CURRENT_CONGRESS), vote.chamber)
+        if archive.append(vote):
+            added += 1
+
+    print "Archived {} new roll calls".format(added)
+
+
+if __name__ == "__main__":
+    main()
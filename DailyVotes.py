@@ -1,37 +1,235 @@
 """
-DailyVotes: POSTs the day's votes according to ProPublica
+DailyVotes: POSTs the day's votes according to ProPublica, for both the House and the Senate.
+Each chamber runs as its own pipeline (fetch list, filter new, build Votes, render) in a thread of its own, and the
+rendered votes are posted from the main thread through one shared RedditClient as they arrive.
+A roll call that could not be fetched or posted is kept in deferred_votes.json and tried again by the next run, however
+old it is by then.
+Usage: python DailyVotes.py [--trace trace.json]
 """
 
-from FiveThreeFive import Vote, RedditClient, PP_KEY, REDDIT_PWD, REDDIT_USN
-import requests
+from FiveThreeFive import Vote, RedditClient, TRACER, RESILIENCE, WRITE_BEHIND, WORKING_SET, ProPublicaError, \
+    CircuitOpenError, atomic_write, billtime, pp_key, propublica_get, reddit_credentials
+import Queue
 import datetime
+import json
+import os
+import sys
+import threading
+import traceback
 
-"""Client"""
-alien = RedditClient(REDDIT_PWD, REDDIT_USN)
+CHAMBERS = ['house', 'senate']
+FINISHED = None  # Put on the outbox by a chamber pipeline when it has nothing more to post
+DEFERRED_FILE = 'deferred_votes.json'  # chamber: vote-list entries a run deferred, replayed by the next run
 
-""""Gather votes in a 24-hr period"""
-month = datetime.datetime.now().strftime("%m")
-# month = '02'
-year = datetime.datetime.now().strftime("%Y")
-updated_votes = requests.get("https://api.propublica.org/congress/v1/house/votes/{}/{}.json".format(year, month),
-                             headers={"X-API-Key": PP_KEY})
-print "Got the votes"
-uv_json = updated_votes.json()['results']
 
-votes = []
+def fetch_vote_list(chamber, when):
+    """
+    :return: ProPublica's list of the chamber's roll calls in *when*'s month
+    :rtype: list of dict
+    """
 
-for vote in uv_json['votes']:
-    print "Building Vote object"
-    votes.append(Vote(vote['congress'], 'house', vote['roll_call'], key=PP_KEY))
+    with TRACER.span('vote list fetch', chamber=chamber):
+        updated_votes = propublica_get("https://api.propublica.org/congress/v1/{}/votes/{}/{}.json"
+                                       .format(chamber, when.strftime("%Y"), when.strftime("%m")))
+    print "Got the {} votes".format(chamber)
+    return updated_votes['results']['votes']
 
-for vote in votes:
-    if vote.datetime > (datetime.datetime.now() - datetime.timedelta(days=1)):
-        print "Attempting post"
-        r = vote.post(alien)
 
-        print r.status_code
-        print r.text
-        print r.headers
+def stored_vote(chamber, entry):
+    """
+    :return: the saved Vote for a vote-list entry, or None if it was never saved
+    """
+
+    path = './votes/{}-{}-{}{}.json'.format(entry['congress'], entry['session'], chamber, entry['roll_call'])
+    if os.path.exists(path):
+        return WORKING_SET.vote(path) or Vote(file_path=path)
+
+    # Votes saved before their files were named by Vote.unique_id() are in ./votes/house76.json, which may be an
+    # earlier session's roll call with the same number. Those files never recorded a congress, only the session.
+    legacy_path = './votes/{}{}.json'.format(chamber, entry['roll_call'])
+    if not os.path.exists(legacy_path):
+        return None
+    vote = WORKING_SET.vote(legacy_path) or Vote(file_path=legacy_path)
+    if str(vote.session) != str(entry['session']) or \
+            str(vote.__dict__.get('congress', entry['congress'])) != str(entry['congress']):
+        return None
+    return vote
+
+
+def load_deferred():
+    """
+    :return: the vote-list entries the last run deferred, by chamber
+    :rtype: dict
+    """
+
+    if not os.path.exists(DEFERRED_FILE):
+        return {}
+    with open(DEFERRED_FILE, 'r') as deferred_file:
+        return json.load(deferred_file)
+
+
+def save_deferred(deferred):
+    """
+    :param list deferred: (chamber, vote-list entry) pairs this run deferred
+    """
+
+    by_chamber = {}
+    for chamber, entry in deferred:
+        by_chamber.setdefault(chamber, []).append(entry)
+
+    atomic_write(DEFERRED_FILE, json.dumps(by_chamber))
+
+
+def new_votes(chamber, listing, cutoff, replay=()):
+    """
+    Filters a vote list down to the recent roll calls that still need posting, using the list entries' own date/time
+    so that nothing heavier than the list is fetched on a quiet day
+    :param replay: vote-list entries an earlier run deferred; these are considered however old they are
+    :return: generator of (entry, saved Vote or None) pairs
+    """
+
+    replayed = set(entry['vote_uri'] for entry in replay)
+    listed = set(entry['vote_uri'] for entry in listing)
+    for entry in list(listing) + [entry for entry in replay if entry['vote_uri'] not in listed]:
+        if entry['vote_uri'] not in replayed and billtime(entry, raw=True) <= cutoff:
+            continue
+        stored = stored_vote(chamber, entry)
+        if stored is None or stored.needs_publish():
+            yield entry, stored
+
+
+def chamber_pipeline(chamber, cutoff, outbox, replay, deferred):
+    """
+    Fetches, filters, builds and renders one chamber's new votes, handing each to the poster through *outbox*
+    :param list replay: the chamber's vote-list entries the last run deferred
+    :param list deferred: where (chamber, entry) is added for each roll call that has to wait for the next run
+    """
+
+    import requests
+
+    try:
+        listing = fetch_vote_list(chamber, datetime.datetime.now())
+    except (ProPublicaError, CircuitOpenError, requests.RequestException) as e:
+        RESILIENCE.defer('{} vote list'.format(chamber), e)
+        deferred.extend((chamber, entry) for entry in replay)
+        outbox.put(FINISHED)
+        return
+
+    try:
+        for entry, vote in new_votes(chamber, listing, cutoff, replay):
+            if vote is None:  # A vote that was saved before its post finished is resumed, not fetched again
+                print "Building {} Vote object".format(chamber)
+                try:
+                    vote = Vote(entry['vote_uri'], pp_key())
+                except (ProPublicaError, CircuitOpenError, requests.RequestException) as e:
+                    RESILIENCE.defer('{} roll call {}'.format(chamber, entry['roll_call']), e)
+                    deferred.append((chamber, entry))
+                    continue
+            outbox.put((entry, vote, vote.render()))
+    except Exception:
+        traceback.print_exc()  # One chamber failing should not stop the other from posting
+    finally:
+        outbox.put(FINISHED)
+
+
+def main():
+    WORKING_SET.restore()  # Rosters, member index and recent votes from the last run's snapshot, if still valid
+    cutoff = datetime.datetime.now() - datetime.timedelta(days=1)
+    outbox = Queue.Queue()
+    replay = load_deferred()
+    deferred = []  # (chamber, vote-list entry) for every roll call left to the next run
+
+    for chamber in CHAMBERS:
+        pipeline = threading.Thread(target=chamber_pipeline, name=chamber,
+                                    args=(chamber, cutoff, outbox, replay.get(chamber, []), deferred))
+        pipeline.daemon = True
+        pipeline.start()
+
+    """Post from this thread as the pipelines deliver, so Reddit sees one client and one rate budget"""
+    alien = None
+    running = len(CHAMBERS)
+    while running:
+        item = outbox.get()
+        if item is FINISHED:
+            running -= 1
+            continue
+
+        entry, vote, rendered = item
+        if alien is None:
+            alien = RedditClient(*reddit_credentials())
+        if not post_vote(alien, vote, rendered):
+            deferred.append((vote.chamber, entry))
+
+    if alien is None:
+        print "No new votes"
+    finish(alien)
+    save_deferred(deferred)
+    WORKING_SET.save()
+
+
+def post_vote(alien, vote, rendered):
+    """
+    Posts a rendered vote and stages it to be saved, deferring it if Reddit could not take the post
+    :return: True if the vote was posted
+    """
+
+    import requests
+
+    print "Attempting post"
+    with TRACER.span('post', vote=vote.id, chamber=vote.chamber):
+        try:
+            vote.fullname = vote.unicode_post(alien, rendered=rendered)
+        except (CircuitOpenError, requests.RequestException) as e:
+            # A submit that may have gone through is left begun in the journal, so the next attempt looks for it
+            # instead of posting again
+            vote.fullname = None
+            RESILIENCE.defer('{} vote {}'.format(vote.chamber, vote.id), e)
+        else:
+            if not vote.fullname:
+                RESILIENCE.defer('{} vote {}'.format(vote.chamber, vote.id), "Reddit did not accept the post")
+        print vote.fullname
+        vote.save()  # Saved even unposted, so the journal lets the next run resume it
+
+    return bool(vote.fullname)
+
+
+def finish(alien):
+    """
+    Writes the staged votes, sends the queued flair and removals, and reports what was deferred
+    :param RedditClient alien: the client the votes were posted with, or None if nothing was posted
+    """
+
+    # The saves only staged the votes; write them all in one batch now that posting is done
+    written = WRITE_BEHIND.flush()
+    if written:
+        print "{} vote file(s) written".format(written)
+
+    if alien is not None:
+        # Flair and removals were queued behind the new posts; send whatever is left
+        import requests
+
+        try:
+            alien.flush()
+        except (CircuitOpenError, requests.RequestException) as e:
+            RESILIENCE.defer('queued flair and removals', e)
+
+    if RESILIENCE.deferred:
+        print "{} item(s) deferred to the next run:".format(len(RESILIENCE.deferred))
+        for item, reason in RESILIENCE.deferred:
+            print "  {}: {}".format(item, reason)
+        del RESILIENCE.deferred[:]
+
+
+if __name__ == "__main__":
+    trace_path = sys.argv[sys.argv.index('--trace') + 1] if '--trace' in sys.argv else None
+    if trace_path:
+        TRACER.enable()
+    try:
+        main()
+    finally:
+        if trace_path:
+            TRACER.export(trace_path)
+            print "Trace written to {}".format(trace_path)
 
 """Sample Response:
 
@@ -0,0 +1,19 @@
+"""
+ExportVotes: streams every stored vote's member positions into one flat table.
+Usage: python ExportVotes.py positions.csv
+       python ExportVotes.py positions.npz
+Re-running against the same file only appends the roll calls stored since the last export.
+"""
+
+from FiveThreeFive import VoteExporter, iter_stored_votes
+import sys
+
+
+def main(path):
+    exporter = VoteExporter(path)
+    added = exporter.export(iter_stored_votes())
+    print "Exported {} new roll calls to {} ({} in total)".format(added, path, len(exporter.exported))
+
+
+if __name__ == "__main__":
+    main(sys.argv[1] if len(sys.argv) > 1 else 'positions.csv')
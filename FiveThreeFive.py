@@ -6,36 +6,104 @@ Author: James C. Lynch
 Code: Python 2
 """
 import re
-import cStringIO
 import codecs
 import csv
 import datetime
 import time
-import requests
-import requests.auth
-import deepdiff
 import os
 import json
-from configparser import ConfigParser
+import math
+import hashlib
+import atexit
+import sqlite3
+import struct
+import mmap
+import calendar
+import zipfile
+import shutil
+import random
+import inspect
+import unicodedata
+import threading
+import zlib
+import copy
+from contextlib import contextmanager
+from bisect import bisect_right
+from collections import deque
 from warnings import warn
-from dateutil import parser, tz
-from cPickle import HIGHEST_PROTOCOL, dump, load
+from cPickle import HIGHEST_PROTOCOL, dumps, load
+
+# requests, dateutil, cStringIO and configparser are imported inside the functions that use them. DailyVotes runs from
+# cron and usually finds nothing to do, so importing this module should not pay for libraries it may never touch.
 
 """Global Variables"""
 CURRENT_CONGRESS = '115'
 BILL_FLAIR_ID = "db59d2b0-10df-11e7-9495-0ee45a3eb946"
+# Hardcoded values; if something flair-related breaks, it'll probably be this.
+VOTE_PASS_FLAIR_ID = "72c210b8-eee9-11e6-a5ae-0eaf4dbf6b74"
+VOTE_FAIL_FLAIR_ID = "76cdad02-eee9-11e6-8acb-0e942a836e52"
+COMMENT_LIMIT = 10000  # Reddit rejects comment bodies longer than this
+
+"""RedditClient request priorities"""
+PRIORITY_HIGH = 0  # New submissions and their comments: sent immediately
+PRIORITY_LOW = 1  # Cosmetic follow-ups (flair, hide, bill body edits): queued until there is spare budget
+
+# Host-wide state that every script has to agree on lives beside this module, wherever a script is started from
+LIBRARY_DIRECTORY = os.path.dirname(os.path.abspath(__file__))
+TOKEN_CACHE_FILE = os.path.join(LIBRARY_DIRECTORY, '.reddit_token.json')
+TOKEN_REFRESH_MARGIN = 300  # Seconds before expiry at which an OAuth token is replaced
+RATE_BUDGET_FILE = os.path.join(LIBRARY_DIRECTORY, '.reddit_budget.db')
+SEARCH_INDEX_FILE = 'search.db'
+SUBJECT_CACHE_FILE = 'subjects.json'
+NO_SUBJECTS = [u'No subjects found.']  # Stored as a bill's subjects by older versions when the lookup failed
+DIGEST_FILE = 'digest.db'
+SNAPSHOT_FILE = 'working_set.pickle'
+ARCHIVE_DIRECTORY = './archive'
+BILL_DIRECTORY = './bills'
+RENDER_CACHE_DIRECTORY = './cache/render'
+STORAGE_COMPRESSION = 6  # zlib level vote and bill files are gzipped at; None writes plain JSON
+COMMITTEE_CACHE_DIRECTORY = './cache/committees'
+COMMITTEE_TTL = 24 * 3600  # Seconds a chamber's committee list and memberships are trusted before refetching
 
 """Config-derrived Globals"""
 
-config = ConfigParser()
-config.read('config.ini')
+CONFIG_FILE = 'config.ini'
+_config = None  # Parsed on first use by setting()
+
+
+def setting(section, option):
+    """
+    Reads one value out of config.ini. The file is only parsed the first time a setting is asked for.
+    :param str section: i.e. 'reddit' or 'propublica'
+    :param str option: i.e. 'username' or 'key'
+    :return: the configured value
+    :rtype: str
+    """
+
+    global _config
+    if _config is None:
+        from configparser import ConfigParser
+        _config = ConfigParser()
+        _config.read(CONFIG_FILE)
+
+    return _config.get(section, option)
+
+
+def pp_key():
+    """
+    :return: the ProPublica API key from config.ini
+    """
+
+    return setting('propublica', 'key')
+
+
+def reddit_credentials():
+    """
+    :return: tuple of the Reddit username and password from config.ini
+    :rtype: tuple of str
+    """
 
-REDDIT_USN = config.get('reddit', 'username')
-REDDIT_PWD = config.get('reddit', 'password')
-USER_AGENT = config.get('reddit', 'user_agent')
-_BOT_SECRET = config.get('reddit', 'app_secret')
-_BOT_ID = config.get('reddit', 'app_id')
-PP_KEY = config.get('propublica', 'key')
+    return setting('reddit', 'username'), setting('reddit', 'password')
 
 # ======================================================================================================================
 
@@ -45,8 +113,7 @@ def main():
 
 
 # ----------------------------------------------------------------------------------------------------------------------
-def authorize(username, password, user_agent=USER_AGENT, app_id=_BOT_ID,
-              app_secret=_BOT_SECRET):
+def authorize(username, password, user_agent=None, app_id=None, app_secret=None):
     """
     Secure a temporary OAuth token from the Reddit API. This is good for 3600 seconds
     :param app_id: Public ID for the Reddit app
@@ -59,6 +126,12 @@ def authorize(username, password, user_agent=USER_AGENT, app_id=_BOT_ID,
     :rtype: dict
     """
 
+    import requests.auth
+
+    user_agent = user_agent or setting('reddit', 'user_agent')
+    app_id = app_id or setting('reddit', 'app_id')
+    app_secret = app_secret or setting('reddit', 'app_secret')
+
     url = "https://www.reddit.com/api/v1/access_token"
 
     client_auth = requests.auth.HTTPBasicAuth(app_id, app_secret)
@@ -85,6 +158,8 @@ def reddit_ini(filename):
     :rtype: tuple of str
     """
 
+    from configparser import ConfigParser
+
     reader = ConfigParser()
 
     reader.read(filename)
@@ -101,13 +176,10 @@ def update_house_csv():
     :return: None
     """
 
-    """Set headers"""
-    headers = {"X-API-Key": "PP_KEY"}
-
     """Generate list of house members"""
-    houser = requests.get("https://api.propublica.org/congress/v1/115/house/members.json", headers=headers)
-    assert houser.status_code == 200  # Just so we don't blow up our current CSV without a replacement.
-    reps = houser.json()['results'][0]['members']  # Isolate representatives themselves
+    # Raises on any error, just so we don't blow up our current CSV without a replacement.
+    houser = propublica_get("https://api.propublica.org/congress/v1/115/house/members.json")
+    reps = houser['results'][0]['members']  # Isolate representatives themselves
 
     """Open/Generate the CSV file"""
     with open("house.csv", "wb+") as csvfile:
@@ -130,6 +202,8 @@ def update_house_csv():
             """Write row"""
             f.writerow([rep[entry] for entry in headers])
 
+    Roster.sync('house')
+
     return
 
 
@@ -140,13 +214,10 @@ def update_senate_csv():
     :return: None
     """
 
-    """Set headers"""
-    headers = {"X-API-Key": "PP_KEY"}
-
     """Generate list of house members"""
-    senate_response = requests.get("https://api.propublica.org/congress/v1/115/senate/members.json", headers=headers)
-    assert senate_response.status_code == 200  # Just so we don't blow up our current CSV without a replacement.
-    senators = senate_response.json()['results'][0]['members']  # Isolate representatives themselves
+    # Raises on any error, just so we don't blow up our current CSV without a replacement.
+    senate_response = propublica_get("https://api.propublica.org/congress/v1/115/senate/members.json")
+    senators = senate_response['results'][0]['members']  # Isolate representatives themselves
 
     """Open/Generate the CSV file"""
     with open("senate.csv", "wb+") as csvfile:
@@ -169,6 +240,8 @@ def update_senate_csv():
             """Write row"""
             f.writerow([senator[entry] for entry in headers])
 
+    Roster.sync('senate')
+
     return
 
 
@@ -176,17 +249,14 @@ def update_senate_csv():
 def moc_lookup(name, chamber):
     """
     Looks up the name of a MOC in the local csv and returns its info.
-    :param name:
-    :param chamber:
-    :return:
+    :param name: the member's first and last name, i.e. 'Lamar Alexander'
+    :param chamber: 'house' or 'senate'
+    :return: the member's roster row (see MemberIndex), or None if no member of the chamber has that name
+    :rtype: dict
     """
-    steve = csv.DictReader('{}.csv'.format(chamber.lower))
-    row = steve.next()
-
-    while row[0] + ' ' + row[2] != name:
-        row = steve.next()
 
-    return row
+    matches = MemberIndex.shared().by_name(name, chamber.lower())
+    return matches[0] if matches else None
 
 
 # ----------------------------------------------------------------------------------------------------------------------
@@ -195,9 +265,14 @@ def load_with_datetime(pairs):
     """Handles deserialization of Bill objects.
     credit to: http://stackoverflow.com/questions/14995743/how-to-deserialize-the-datetime-in-a-json-object-in-python
     """
+    from dateutil import parser
+
     d = {}
     for k, v in pairs:
-        if isinstance(v, basestring):
+        if k == 'timeline' and v is not None:
+            d[k] = Timeline.from_json(v)
+
+        elif isinstance(v, basestring):
 
             if k == 'votes':
                 d[k] = Vote(file_path=v[1:-1])
@@ -224,9 +299,10 @@ def load_with_datetime(pairs):
 def date_handler(obj):
     if isinstance(obj, datetime.datetime):
         return obj.isoformat()
+    elif isinstance(obj, Timeline):
+        return obj.to_json()
     elif isinstance(obj, Vote):
-        obj.save()
-        return "<{}>".format(obj.json_file)
+        return "<{}>".format(obj.json_file)  # Votes are saved to their own files; Bill.save stages them
     elif isinstance(obj, str):
         pass
     elif isinstance(obj, unicode):
@@ -237,6 +313,64 @@ def date_handler(obj):
         )
 
 
+# ----------------------------------------------------------------------------------------------------------------------
+
+GZIP_MAGIC = '\x1f\x8b'
+
+
+def encode_document(text):
+    """
+    :param str text: a vote or bill's JSON
+    :return: the bytes it is stored as: gzip-compressed at STORAGE_COMPRESSION, or the plain JSON if that is None
+    :rtype: str
+    """
+
+    if STORAGE_COMPRESSION is None:
+        return text
+    compressor = zlib.compressobj(STORAGE_COMPRESSION, zlib.DEFLATED, 16 + zlib.MAX_WBITS)  # 16+: gzip container
+    return compressor.compress(text) + compressor.flush()
+
+
+def atomic_write(path, data, permissions=None, sync=False):
+    """
+    Replaces a file's contents by writing them next to it and renaming them over it, so a crash mid-write leaves the
+    old contents rather than a truncated file
+    :param str path: the file to write
+    :param str data: its new contents
+    :param int permissions: the mode to create the file with, e.g. 0600 for secrets; None for the umask default
+    :param bool sync: fsync before renaming, so the new contents survive a power loss once this returns
+    """
+
+    temp_path = path + '.tmp'
+    if permissions is None:
+        data_file = open(temp_path, 'wb')
+    else:
+        fd = os.open(temp_path, os.O_WRONLY | os.O_CREAT | os.O_TRUNC, permissions)
+        os.fchmod(fd, permissions)  # In case a stale temp file was left with looser permissions
+        data_file = os.fdopen(fd, 'wb')
+    with data_file:
+        data_file.write(data)
+        if sync:
+            data_file.flush()
+            os.fsync(data_file.fileno())
+    os.rename(temp_path, path)
+
+
+def read_document(path):
+    """
+    Reads a stored vote or bill, telling compressed files from plain JSON ones by their first bytes, so files written
+    before compression (or with it turned off) keep loading
+    :return: the JSON text
+    :rtype: str
+    """
+
+    with open(path, 'rb') as document_file:
+        data = document_file.read()
+    if data[:2] == GZIP_MAGIC:
+        return zlib.decompress(data, 16 + zlib.MAX_WBITS)
+    return data
+
+
 # ----------------------------------------------------------------------------------------------------------------------
 
 def billtime(vote, raw=False):  # TODO: Nest this in Vote as a static
@@ -252,6 +386,41 @@ def billtime(vote, raw=False):  # TODO: Nest this in Vote as a static
     else:
         return bt.strftime('%A, %B %d, %Y at %X')
 
+# ----------------------------------------------------------------------------------------------------------------------
+
+def pack_comments(roll, limit=COMMENT_LIMIT):
+    """
+    Packs a roll call's member lists into the fewest comment bodies that each stay under *limit* characters.
+    Small position buckets share a comment, and a bucket too large for one comment is split between two members and
+    carried on under a "(cont.)" heading.
+    :param list roll: (position, [member label, ...]) pairs in the order they should be read
+    :return: the comment bodies
+    :rtype: list of unicode
+    """
+
+    comments = []
+    body = u''
+
+    for position, members in roll:
+        lines = [member + u'; \n' for member in members] or [u'']
+        for i, line in enumerate(lines):
+            heading = u'' if i else u'**{}({}):**\n\n'.format(position, len(members))
+
+            # The 2 leaves room for the blank line that closes the bucket
+            if body and len(body) + len(heading) + len(line) + 2 > limit:
+                comments.append(body)
+                body = u''
+                if i:
+                    heading = u'**{}(cont.):**\n\n'.format(position)
+
+            body += heading + line
+        body += u'\n\n'
+
+    if body:
+        comments.append(body)
+
+    return comments
+
 # ----------------------------------------------------------------------------------------------------------------------
 """From https://docs.python.org/2/library/csv.html"""
 """Provides unicode-compatible csv ops"""
@@ -296,6 +465,8 @@ class UnicodeWriter:
     """
 
     def __init__(self, f, dialect=csv.excel, encoding="utf-8", **kwds):
+        import cStringIO
+
         # Redirect output to a queue
         self.queue = cStringIO.StringIO()
         self.writer = csv.writer(self.queue, dialect=dialect, **kwds)
@@ -320,887 +491,3766 @@ class UnicodeWriter:
 
 
 # ----------------------------------------------------------------------------------------------------------------------
-"""What follows is the class hierarchy for the 535 project, currently including Bills, MOCs, and Votes"""
 
 
-class Bill:
-    def __init__(self, url=None, file_path=None):
+class Roster:
+    """
+    One chamber's members as listed in the local {chamber}.csv, with each member's display label preformatted.
+    Labels are built once per roster version (a hash of the CSV) and persisted next to the CSV in
+    {chamber}.labels.json, so rendering a roll call is an index lookup per member instead of a CSV scan.
+    """
+
+    # Column numbers follow the update_house_csv/update_senate_csv headers: 0 first, 2 last, 3 state, 4 district, 5 party
+    LABEL_FORMATS = {
+        'senate': u'{2}, {0} ({5}-{3})',
+        'house': u'{2} ({5}-{3}/{4})'  # Shortened string for house
+    }
+    ID_COLUMN = 7
+
+    _loaded = {}  # chamber: Roster, shared by every Vote in the process
+    _lock = threading.RLock()  # DailyVotes renders each chamber from a thread of its own
+
+    def __init__(self, chamber, csv_path=None):
         """
-        A Bill object that can store amendments, updates, and a time-line. All these arguments are optional, because you
-        :param str url: The ProPublica URL. The class can be created manually via the from_params class
+        :param str chamber: 'house' or 'senate'
+        :param str csv_path: the roster CSV, {chamber}.csv in the working directory by default
         """
 
-        """Initialize vars - more for clarity's sake. Most of the actual __init__ assigning will be done via GET or deserialization"""
+        self.chamber = chamber
+        self.csv_path = csv_path or '{}.csv'.format(chamber)
+        self.labels_path = os.path.splitext(self.csv_path)[0] + '.labels.json'
+        self.label_format = self.LABEL_FORMATS[chamber]
 
-        self.chamber = self.session = self.bill_id = self.votes = self.timeline = self.subjects = self.title = \
-            self.name = self.official_link = self.birthday = self.cosponsors = self.sponsor_party = self.sponsor = \
-                self.sponsor_state = self.sparknotes = self.last_action = self.committees = self.passed = \
-            self.passed_house = self.passed_senate = self.vetoed = self.status = self.raw_type = self.type = \
-            self.post_body = self.tracking = None
+        with open(self.csv_path, 'rb') as csv_file:
+            raw = csv_file.read()
+        self.version = hashlib.sha1(raw + self.label_format.encode('utf-8')).hexdigest()
+        self.stamp = self._stamp()
 
-        """Deserializing method"""
-        if file_path:
-            with open(file_path, 'r') as json_file:
-                try:
-                    self.__dict__.update(json.loads(json_file.read(), object_pairs_hook=load_with_datetime))
-                    return
-                except ValueError:
-                    print '{} FILE:'.format(file_path) + json_file.read()
-                    raise
-        else:
-            self.tracking = True  # If constructing from url (not reloading), assume we want to track it.
-            self.url = url  # This shouldn't be overwritten because the filepath option will return before reassignment
-            self.propublica_pull()
+        self.ids = []  # Member ids in CSV order
+        self.labels = []  # Parallel to self.ids
+        if not self._load_labels():
+            self._build_labels()
 
-        """Fullname Placeholder"""
-        self.fullname = None
+        self.index = {member_id: i for i, member_id in enumerate(self.ids)}
 
-        """JSON settings"""
-        self.json_file = './bills/' + self.bill_id + '.json'
+    @classmethod
+    def load(cls, chamber):
+        """
+        Returns the chamber's roster, reading it from disk only if it has not been loaded yet or the CSV has changed
+        :rtype: Roster
+        """
 
-    def __eq__(self, other):
-        return self.__dict__ == other.__dict__
+        with cls._lock:
+            roster = cls._loaded.get(chamber)
+            if roster is None or roster.stamp != roster._stamp():
+                roster = cls._loaded[chamber] = cls(chamber)
 
-    def needs_update(self, other):
+        return roster
+
+    @classmethod
+    def sync(cls, chamber):
         """
-        Different from __eq__ in that this comparison function only checks what we care about - that is, the data that
-        we publish to Reddit. Because most bills we pull down don't have serialization info, they won't be equivalent.
-        :param Bill other: Bill object that has NOT been serialized
-        :return: True if all the following fields match up:
-                    self.title, self.name, self.type, self.birthday, self.status, self.official_link, self.subjects,
-                    self.votes, self.sparknotes, self.timeline(.items())
+        Rebuilds the chamber's labels after its CSV has been rewritten
+        :rtype: Roster
         """
 
-        if self.title != other.title:
-            print self.title
-            print other.title
-            return True
-        if self.name != other.name:
-            print self.name
-            print other.name
-            return True
-        if self.type != other.type:
-            print self.type
-            print other.type
-            return True
-        if self.birthday != other.birthday:
-            print self.birthday
-            print other.birthday
-            return True
-        if self.status != other.status:
-            print self.status
-            print other.status
-            return True
-        if self.official_link != other.official_link:  # We just want there to be a source there
-            print self.official_link
-            print other.official_link
-            return True
-        if self.sparknotes != other.sparknotes:
-            return True
-        if self.timeline != other.timeline:
-            return True
-        if self.votes != other.votes:
-            return True
-        return False
+        with cls._lock:
+            cls._loaded.pop(chamber, None)
+            return cls.load(chamber)
 
-    @classmethod
-    def from_params(cls, chamber, bill_id):
+    def _stamp(self):
         """
-        Generates the class with parameters instead of a url, constructing the url along the way
-        :param key:
-        :param chamber:
-        :param congress:
-        :param bill_type:
-        :param bill_id:
-        :return:
+        :return: a cheap fingerprint (mtime and size) of the CSV, to notice it changing under a long-running process
         """
 
-        new_bill = cls("https://api.propublica.org/congress/v1/{}/bills/{}.json"
-                                .format(chamber, bill_id), PP_KEY)
+        info = os.stat(self.csv_path)
+        return info.st_mtime, info.st_size
 
-        return new_bill
+    def _load_labels(self):
+        """
+        Reads the persisted labels if they were built from this exact roster version
+        :return: True if the labels were usable
+        """
 
-    @staticmethod
-    def _parse_actions(actions_list):
+        if not os.path.exists(self.labels_path):
+            return False
+
+        with open(self.labels_path, 'r') as labels_file:
+            cached = json.load(labels_file)
+        if cached.get('version') != self.version:
+            return False
+
+        self.ids = cached['ids']
+        self.labels = cached['labels']
+        return True
+
+    def _build_labels(self):
         """
-        Parses the ProPublica JSON object in format list dict (containing a datestamp entry and a description entry)
-        into a dictionary with the format {[timestamp string]: [string desctiption]}
-        :param actions_list:
-        :return: dctionary of actions
-        :rtype: dict
+        Formats every member's label from the CSV and persists them with the roster version
         """
 
-        actions_dict = {}
+        with open(self.csv_path, 'rb') as csv_file:
+            reader = UnicodeReader(csv_file)
+            reader.next()  # Headers
+            for row in reader:
+                self.ids.append(row[self.ID_COLUMN])
+                self.labels.append(self.label_format.format(*row))
 
-        for action in actions_list:
-            dt = parser.parse(action['datetime'])  # Strip datetime literal in UTC
-            dt.astimezone(tz.tzlocal())  # Convert to local timezone
-            actions_dict.update({dt: action['description']})
+        atomic_write(self.labels_path, json.dumps({'version': self.version, 'ids': self.ids, 'labels': self.labels}))
 
-        return actions_dict
+    def label(self, position):
+        """
+        :param dict position: an entry of Vote.positions
+        :return: the member's preformatted label. Members missing from the CSV get a label built from the position
+        :rtype: unicode
+        """
 
-    def get_subjects(self, key):
+        i = self.index.get(position['member_id'])
+        if i is None:
+            return u'{} ({}-{})'.format(position.get('name'), position.get('party'), position.get('state'))
 
-        # Define authentication headers
-        headers = {"X-API-Key": key}
+        return self.labels[i]
 
-        # API call parameters
-        url = "https://api.propublica.org/congress/v1/{session}/bills/{bill_id}/subjects.json".format(**self.__dict__)
 
-        subject_r = requests.get(url, headers=headers)
+class MemberIndex:
+    """
+    Every member of both chambers' rosters, indexed by member id, exact name, last name, seat (state and district)
+    and twitter handle, plus a trigram index for fuzzy names, so a name typed by a user resolves with a few dict
+    lookups. Names are matched case- and accent-insensitively. The index is rebuilt whenever a roster changes.
+    Members are the roster CSV rows as dicts, with 'null' cells as None and a 'chamber' key added.
+    """
 
-        # If for any reason we encounter an error getting the subjects, construct a dummy list and return it.
+    CHAMBERS = ['house', 'senate']
+    MIN_SIMILARITY = 0.4  # Least Dice coefficient between trigram sets for a fuzzy match
 
-        if subject_r.status_code != 200:
-            return ['No subjects found.']
-        subject_json = subject_r.json()
-        if subject_json['status'] == u'ERROR':
-            return ['No subjects found.']
-        subject_dicts = subject_json['results']['subjects']  # list of dict objects
+    _shared = None
 
-        # We return subjects, instead of mutating self.votes in get_votes, because subjects *should* be static
-        return [subject['name'] for subject in subject_dicts]
+    def __init__(self, rosters):
+        """
+        :param rosters: the Roster of every chamber to index
+        """
 
-    def get_votes(self, votes_json, key):
+        self.versions = [roster.version for roster in rosters]
+        self.members = {}  # member_id: member
+        self.names = {}  # normalized 'first last' and 'first middle last': [member_id, ...]
+        self.last_names = {}  # normalized last name: [member_id, ...]
+        self.seats = {}  # (state, district): [member_id, ...]; senators are under (state, None)
+        self.twitter = {}  # lowercase handle: member_id
+        self.trigrams = {}  # trigram: set of member_ids
+        self.gram_counts = {}  # member_id: number of trigrams in the member's name
+
+        for roster in rosters:
+            with open(roster.csv_path, 'rb') as csv_file:
+                for row in csv.DictReader(csv_file):
+                    member = {field: None if value == 'null' else value.decode('utf-8')
+                              for field, value in row.iteritems()}
+                    member['chamber'] = roster.chamber
+                    self._add(member)
+
+    @classmethod
+    def shared(cls):
         """
-        Gets the detailed vote objects (roll calls) by iterating through the less thorough list included in bill JSON
-        :param votes_json: The section of the bill's JSON that pertains to the votes
-        :param key: the ProPublica API key
-        :return: None
+        :return: the process-wide index, rebuilt first if either roster changed since it was built
+        :rtype: MemberIndex
         """
 
-        votes = []
+        rosters = [Roster.load(chamber) for chamber in cls.CHAMBERS]
+        if cls._shared is None or cls._shared.versions != [roster.version for roster in rosters]:
+            cls._shared = cls(rosters)
+        return cls._shared
 
-        if self.votes:
-            # We do not want to overwrite votes that already have a post
-            for vote in self.votes[:]:
-                if type(vote) == unicode:
-                    self.votes[self.votes.index(vote)] = Vote(file_path=str(vote[1:-1]))  # Convert a filepath string to Vote
+    @staticmethod
+    def normalize(name):
+        """
+        :return: *name* lowercased, without accents or punctuation, with single spaces
+        :rtype: unicode
+        """
 
-            stored_ids = [stored_vote.id for stored_vote in self.votes]
-            for vote in votes_json:
-                url = vote['api_url']
-                if url[url.rindex('/') + 1: url.rindex('.')] in stored_ids:  # i.e., if we have the vote logged already
-                    continue
-                else:
-                    # If this is a new vote, we're going to update
-                    self.votes.append(Vote(url, key))
+        if isinstance(name, str):
+            name = name.decode('utf-8')
+        name = unicodedata.normalize('NFKD', name)
+        name = u''.join(c for c in name if not unicodedata.combining(c)).lower()
+        return u' '.join(re.findall(r'[a-z0-9]+', name))
 
+    @staticmethod
+    def grams(name):
+        """
+        :return: the trigrams of a normalized name, padded so short names and word boundaries count
+        :rtype: set
+        """
 
-        else:
-            self.votes = []
-            for vote in votes_json:
-                self.votes.append(Vote(vote['api_url'], key)) # Votes are only to be created in bills, NOT MOCs.
+        padded = u'  {} '.format(name)
+        return set(padded[i:i + 3] for i in range(len(padded) - 2))
+
+    def _add(self, member):
+        member_id = member['id']
+        self.members[member_id] = member
+
+        full_name = self.normalize(u'{} {}'.format(member['first_name'], member['last_name']))
+        names = {full_name}
+        if member['middle_name']:
+            names.add(self.normalize(u'{} {} {}'.format(member['first_name'], member['middle_name'],
+                                                        member['last_name'])))
+        for name in names:
+            self.names.setdefault(name, []).append(member_id)
+        self.last_names.setdefault(self.normalize(member['last_name']), []).append(member_id)
+
+        district = member['district'] if member['chamber'] == 'house' else None
+        self.seats.setdefault((member['state'], district), []).append(member_id)
+        if member.get('twitter_account'):
+            self.twitter[member['twitter_account'].lower()] = member_id
+
+        grams = self.grams(full_name)
+        self.gram_counts[member_id] = len(grams)
+        for gram in grams:
+            self.trigrams.setdefault(gram, set()).add(member_id)
+
+    def _members(self, member_ids, chamber=None):
+        return [self.members[member_id] for member_id in member_ids
+                if chamber is None or self.members[member_id]['chamber'] == chamber]
+
+    def get(self, member_id):
+        """
+        :return: the member, or None if neither roster has *member_id*
+        :rtype: dict
+        """
 
-    def gen_post_body(self, client):
+        return self.members.get(member_id)
+
+    def by_name(self, name, chamber=None):
         """
-        Generates a markdown-formatted post in unicode.
-        :param RedditClient client: Reddit Client to handle vote updates
-        :return: body
-        :rtype: str
+        :param name: 'first last' or 'first middle last'
+        :rtype: list of dict
         """
 
-        body = u''  # We will store our markdown body for the post in this variable as the function progresses.
+        return self._members(self.names.get(self.normalize(name), ()), chamber)
 
-        """Bill headers"""
-        body += u'#{}\n####{}\n\n'.format(self.title, self.name)  # Title of the bill, and the designator as a subtitle
-        body += u'Type: *{}*\n\n'.format(self.type.title())  # String title method (confused me!)
-        body += u'Date Created: {}\n\n'.format(self.birthday)  # Date of creation right under the title
-        body += u'Status: {}\n\n'.format(self.status.replace('_', ' ').title())
-        body += u'######[Link]({})\n'.format(self.official_link)  # Link to official bill info site
-        body += u'\n*****\n\n'  # This string makes a horizontal line
+    def by_last_name(self, last_name, chamber=None):
+        """
+        :rtype: list of dict
+        """
 
-        """Subjects"""
-        body += u'####Subjects: '
-        for subject in self.subjects:
-            body += u'{}, '.format(subject)
-        body = body[:-2]  # strip away final ", "
-        body += u'\n\n'
+        return self._members(self.last_names.get(self.normalize(last_name), ()), chamber)
 
-        """Sponsors"""
-        body += u'####Sponsor: {} ({}-{})\n\n'.format(self.sponsor, self.sponsor_party, self.sponsor_state)
-        # TODO: Add cosponsor names? PP API only gives the name of the main sponsor up-front
+    def by_seat(self, state, district=None):
+        """
+        :param str state: the two-letter state code
+        :param district: the House district, or None for the state's senators
+        :rtype: list of dict
+        """
 
-        """Summary"""
-        body += u'####Summary:\n>{}\n\n'.format(self.sparknotes)
+        return self._members(self.seats.get((state.upper(), str(district) if district is not None else None), ()))
 
-        """Actions"""
-        body += u'##Actions:\nTime|Action\n:---|:---\n'  # Table headers and alignment (both aligned left)
-        for dt, desc in self.timeline.items():
-            body += u'**{}**|{}\n'.format(dt.strftime('%a, %B %m'), desc)
-        body += u'*All times are in U.S. Eastern.*\n\n'
+    def by_twitter(self, handle):
+        """
+        :param str handle: with or without the leading '@'
+        :return: the member, or None
+        :rtype: dict
+        """
 
-        """Votes"""
-        body += u'##Roll Call Votes:\n'
+        member_id = self.twitter.get(handle.lstrip('@').lower())
+        return self.members[member_id] if member_id else None
 
-        # Most of what the chambers pass are not roll call votes - let's catch and reflect this in the post.
-        if len(self.votes) == 0:
-            body += u'**No roll call vote data available**\n'
-        else:
-            for vote in self.votes:
+    def fuzzy(self, name, chamber=None, limit=5):
+        """
+        Finds the members whose names share the most trigrams with *name*, which tolerates typos and partial names
+        :return: (member, similarity) pairs, most similar first, with similarity at least MIN_SIMILARITY
+        :rtype: list of tuple
+        """
 
-                if not vote.fullname:
-                    # If the vote's fullname is not present, that means the vote needs to be posted
-                    vote.fullname = vote.unicode_post(client)
-                if not vote.fullname:  # Another failure means that the post failed, and the linking needs to be skipped
-                    body += u'{}({})\n\n'.format(vote.question, vote.result)
-                else:
-                    # Post a link for each vote that we just posted
-                    body += u'[{}](https://reddit.com/r/535/comments/{})\n\n'.format(vote.question, vote.fullname[3:])
+        grams = self.grams(self.normalize(name))
+        shared = {}
+        for gram in grams:
+            for member_id in self.trigrams.get(gram, ()):
+                shared[member_id] = shared.get(member_id, 0) + 1
 
-        self.post_body = body  # For ease-of-access in append_post
+        scored = []
+        for member_id, count in shared.iteritems():
+            similarity = 2.0 * count / (len(grams) + self.gram_counts[member_id])
+            if similarity >= self.MIN_SIMILARITY and (chamber is None or self.members[member_id]['chamber'] == chamber):
+                scored.append((self.members[member_id], similarity))
+        scored.sort(key=lambda pair: pair[1], reverse=True)
 
-    def post(self, client):
+        return scored[:limit]
+
+    def resolve(self, text, chamber=None):
         """
-        Initially post the vote to Reddit.
-        For updates, use "edit_post".
-        :param RedditClient client: a RedditClient
-        :return: response from the reddit API call.
-        :rtype: requests.Response
+        Resolves whatever a user typed to one member: a member id, a twitter handle ('@SenAlexander'), a House seat
+        ('TN-3'), a full or last name, or failing those the best fuzzy name match
+        :return: the member, or None if nothing matches unambiguously
+        :rtype: dict
         """
 
-        self.gen_post_body(client)
+        text = text.strip()
+        member = self.get(text)
+        if member is None and text.startswith('@'):
+            member = self.by_twitter(text)
+        if member is None:
+            seat = re.match(r'^([A-Za-z]{2})[- ]?(\d+)$', text)
+            if seat:
+                members = self.by_seat(seat.group(1), int(seat.group(2)))
+                member = members[0] if len(members) == 1 else None
+        if member is None:
+            for members in (self.by_name(text, chamber), self.by_last_name(text, chamber)):
+                if len(members) > 1:
+                    return None  # i.e. a last name several members share; a fuzzy guess would be arbitrary
+                if members:
+                    member = members[0]
+                    break
+        if member is None:
+            matches = self.fuzzy(text, chamber, limit=2)
+            if matches and (len(matches) == 1 or matches[0][1] > matches[1][1]):
+                member = matches[0][0]
+
+        return member
 
-        # Reddit's max title length is 300
-        if len(self.title) > 250:
-            self.title = self.title[:247] + '...'
 
-        """Construct the request"""
-        params = {
-            "kind": "self",
-            "text": self.post_body,
-            "sendreplies": "true",
-            # Capitalize the chamber in the title
-            "title": '[{}]: {}'.format(self.type.upper(), self.title),
-            "sr": "535"
-        }
+# ----------------------------------------------------------------------------------------------------------------------
 
-        url = "https://oauth.reddit.com/api/submit"
 
-        post_r = client.request('POST', url, params=params)
-        """Calmly tell Chuck he's an idiot if he messed something up."""
-        if post_r.status_code != 200:
-            warn("Vote post request returned {}".format(post_r.status_code))
-            return False
-        print post_r.text
-        fullname = 't3_' + re.search('comments\/([a-zA-Z0-9_]*)\/', post_r.text).group(1)  # For future comment+/flair
+class Timeline:
+    """
+    A Bill's actions in chronological order, keyed by UTC timestamp.
+    Entries are only ever inserted, never rewritten, so merging a fresh ProPublica actions list only touches the actions
+    we have not seen yet. Rendered table rows are cached per entry, and an update only renders the rows it added.
+    """
 
-        self.fullname = fullname
+    def __init__(self, actions=None):
+        """
+        :param list actions: ProPublica actions, i.e. [{'datetime': '2017-03-01', 'description': '...'}, ...]
+        """
 
-        return fullname
+        self.times = []  # Sorted, timezone-aware UTC datetimes
+        self.descriptions = []  # Parallel to self.times
+        self._rows = []  # Parallel to self.times; the rendered markdown row, or None if not rendered yet
 
-    def save(self, retry=True):
+        if actions:
+            self.merge(actions)
+
+    @staticmethod
+    def _utc(stamp):
         """
-        Serialize the object as a json object
-        :return: None
+        Parses a ProPublica timestamp into an aware UTC datetime. ProPublica gives bare dates for most actions, and
+        those are dates on the Hill, so a naive value is read as U.S. Eastern before converting.
+        :param stamp: a timestamp string or a datetime
+        :rtype: datetime.datetime
+        """
+
+        from dateutil import parser, tz
+
+        when = stamp if isinstance(stamp, datetime.datetime) else parser.parse(stamp)
+        if when.tzinfo is None:
+            when = when.replace(tzinfo=tz.gettz('America/New_York'))
+
+        return when.astimezone(tz.tzutc())
+
+    def add(self, stamp, description):
+        """
+        Inserts one action in order, unless the exact same action is already present
+        :return: True if the action was new
+        """
+
+        when = self._utc(stamp)
+        position = bisect_right(self.times, when)
+
+        # Several actions can share a date, so only an identical time *and* description counts as a duplicate
+        i = position - 1
+        while i >= 0 and self.times[i] == when:
+            if self.descriptions[i] == description:
+                return False
+            i -= 1
+
+        self.times.insert(position, when)
+        self.descriptions.insert(position, description)
+        self._rows.insert(position, None)
+
+        return True
+
+    def merge(self, actions):
+        """
+        Folds a ProPublica actions list into the timeline
+        :param list actions: list of dicts with 'datetime' and 'description' entries
+        :return: the number of actions that were new
+        :rtype: int
+        """
+
+        added = 0
+        for action in actions:
+            if self.add(action['datetime'], action['description']):
+                added += 1
+
+        return added
+
+    def rows(self):
+        """
+        :return: the markdown table rows for every action, rendering only those that have not been rendered before
+        :rtype: list of unicode
+        """
+
+        from dateutil import tz
+
+        eastern = tz.gettz('America/New_York')
+        for i, row in enumerate(self._rows):
+            if row is None:
+                local = self.times[i].astimezone(eastern)
+                self._rows[i] = u'**{}**|{}\n'.format(local.strftime('%a, %B %d'), self.descriptions[i])
+
+        return self._rows
+
+    def items(self):
+        return zip(self.times, self.descriptions)
+
+    def to_json(self):
+        """
+        :return: a list of [isoformat timestamp, description] pairs, oldest first
+        """
+
+        return [[when.isoformat(), description] for when, description in self.items()]
+
+    @classmethod
+    def from_json(cls, value):
+        """
+        Rebuilds a Timeline from to_json() output, or from the {timestamp: description} dict older saves used
+        """
+
+        timeline = cls()
+        pairs = value.items() if isinstance(value, dict) else value
+        for stamp, description in pairs:
+            timeline.add(stamp, description)
+
+        return timeline
+
+    def __len__(self):
+        return len(self.times)
+
+    def __eq__(self, other):
+        return isinstance(other, Timeline) and self.items() == other.items()
+
+    def __ne__(self, other):
+        return not self == other
+
+
+# ----------------------------------------------------------------------------------------------------------------------
+
+
+class Tracer:
+    """
+    Records where a run spends its time as timed spans, exported in the Chrome trace-event format (open the file in
+    chrome://tracing or Perfetto). Spans from every thread land in the same trace, so throttling waits and the
+    serialization between the chamber pipelines and the poster show up directly.
+    Tracing is off until enable() is called; until then span() does no timing and keeps nothing.
+    """
+
+    def __init__(self):
+        self.enabled = False
+        self.events = []
+        self._named_threads = set()
+        self._lock = threading.Lock()
+
+    def enable(self):
+        self.enabled = True
+
+    @contextmanager
+    def span(self, name, **attributes):
         """
+        Times the body of a with-block. Yields the span's attribute dict, so the body can add results (i.e. a status).
+        :param str name: i.e. 'render' or 'submit'
+        :param attributes: anything worth seeing in the trace viewer, i.e. vote='76', chamber='house'
+        """
+
+        if not self.enabled:
+            yield attributes
+            return
 
+        start = time.time()
         try:
-            """Convert datetime keys into isoformat() - they will be re-parsed by the load() pair-catcher"""
-            self.last_action = self.last_action.isoformat()
-            for key, value in self.timeline.items():
-                if type(key) not in (str, unicode):
-                    self.timeline[key.isoformat()] = self.timeline.pop(key)
-
-            """Write File"""
-            with open(self.json_file, 'w') as data_file:
-                json.dump(self.__dict__, data_file, default=date_handler)
-
-            print "{} saved at {}".format(self.name, self.json_file)
-        except AttributeError:
-            if retry:
-                self.last_action = parser.parse(self.last_action)
-                self.save(retry=False)
+            yield attributes
+        finally:
+            end = time.time()
+            thread = threading.current_thread()
+            event = {'name': name, 'cat': '535', 'ph': 'X', 'pid': os.getpid(), 'tid': thread.ident,
+                     'ts': int(start * 1e6), 'dur': int((end - start) * 1e6),
+                     'args': {key: value for key, value in attributes.items() if value is not None}}
+            with self._lock:
+                self.events.append(event)
+                if thread.ident not in self._named_threads:  # Lets the viewer label rows 'house', 'senate', ...
+                    self._named_threads.add(thread.ident)
+                    self.events.append({'name': 'thread_name', 'ph': 'M', 'pid': event['pid'], 'tid': thread.ident,
+                                        'args': {'name': thread.name}})
+
+    def export(self, path):
+        """
+        Writes the recorded spans as a Chrome trace-event JSON file
+        """
+
+        with self._lock:
+            events = sorted(self.events, key=lambda event: event.get('ts', 0))
+        with open(path, 'w') as trace_file:
+            json.dump({'traceEvents': events, 'displayTimeUnit': 'ms'}, trace_file, default=unicode)
+
+
+TRACER = Tracer()  # The run's tracer; enabled by the scripts when asked for a trace
+
+
+# ----------------------------------------------------------------------------------------------------------------------
+
+
+class ProPublicaError(Exception):
+    """
+    ProPublica answered with an error status or an error body
+    """
+    pass
+
+
+class CircuitOpenError(Exception):
+    """
+    A host failed too many times in a row, and calls to it are failing fast until its cooldown is over
+    """
+    pass
+
+
+class Resilience:
+    """
+    The retry and circuit-breaker layer every ProPublica and Reddit call goes through.
+    Idempotent calls that fail with a connection error, a 429 or a 5xx are retried with exponential backoff and full
+    jitter, honoring Retry-After when the server sends it; other calls are only retried on a 429, which the server
+    refused without acting on. Each host has a circuit breaker: after *failure_threshold* failures in a row, calls to
+    that host raise CircuitOpenError for *cooldown* seconds instead of tying up the run, and then one trial call decides
+    whether it closes again.
+    Work that had to be given up is recorded with defer(), so a run can report what needs reprocessing.
+    """
+
+    RETRY_STATUSES = (429, 500, 502, 503, 504)
+
+    def __init__(self, attempts=4, base_delay=1.0, max_delay=60.0, failure_threshold=5, cooldown=300):
+        """
+        :param int attempts: tries per call, including the first
+        :param float base_delay: seconds before the first retry; doubled for each one after
+        :param float max_delay: longest backoff (or Retry-After) that will be waited out
+        :param int failure_threshold: consecutive failures that open a host's breaker
+        :param float cooldown: seconds a breaker stays open
+        """
+
+        self.attempts = attempts
+        self.base_delay = base_delay
+        self.max_delay = max_delay
+        self.failure_threshold = failure_threshold
+        self.cooldown = cooldown
+
+        self.breakers = {}  # host: {'failures': consecutive failures, 'opened_at': time opened, or None}
+        self.deferred = []  # (item, reason) pairs
+        self._lock = threading.Lock()
+
+    def _admit(self, host):
+        """
+        Fails fast if *host*'s breaker is open. Once the cooldown is over, one caller gets through as the trial.
+        """
+
+        with self._lock:
+            breaker = self.breakers.setdefault(host, {'failures': 0, 'opened_at': None})
+            if breaker['opened_at'] is None:
+                return
+            if time.time() - breaker['opened_at'] < self.cooldown:
+                raise CircuitOpenError("{} is failing; not calling it for {:.0f}s".format(
+                    host, self.cooldown - (time.time() - breaker['opened_at'])))
+            breaker['opened_at'] = time.time()  # Half-open: let this call through, hold the others off again
+
+    def _record(self, host, succeeded):
+        with self._lock:
+            breaker = self.breakers[host]
+            if succeeded:
+                breaker['failures'] = 0
+                breaker['opened_at'] = None
             else:
-                raise
+                breaker['failures'] += 1
+                if breaker['failures'] >= self.failure_threshold:
+                    breaker['opened_at'] = time.time()
+                    warn("Circuit opened for {} after {} failures".format(host, breaker['failures']))
 
-    def load(self):
+    def _delay(self, attempt, response):
         """
-        Deserializes the object's json file at json_file and updates the object's __dict__ directly
-        :return:
+        :return: seconds to wait before the next attempt: the server's Retry-After if it gave one, else a random
+                 (full jitter) share of the exponential backoff
         """
-        with open(self.json_file, 'r') as data_file:
-            self.__dict__ = json.load(data_file)
 
-    def propublica_pull(self):
+        retry_after = response.headers.get('Retry-After') if response is not None else None
+        if retry_after:
+            try:
+                return min(float(retry_after), self.max_delay)
+            except ValueError:  # An HTTP date rather than seconds
+                from email.utils import parsedate_tz, mktime_tz
+                parsed = parsedate_tz(retry_after)
+                if parsed:
+                    return min(max(mktime_tz(parsed) - time.time(), 0), self.max_delay)
+
+        return random.uniform(0, min(self.max_delay, self.base_delay * 2 ** attempt))
+
+    def call(self, send, url, idempotent=True):
         """
-        Assigns most self variables based on a new json call. Does not edit post-related attrs
-        :return:
+        Makes a call through the retry policy and *url*'s host breaker
+        :param send: function that makes the request and returns a requests.Response
+        :param str url: the url being called; its host picks the breaker
+        :param bool idempotent: whether repeating the call after a 5xx or connection error is safe
+        :return: the last response, which may still be an error if the retries ran out
+        :raises CircuitOpenError: if the host's breaker is open
         """
 
-        """Attributes defined via API call below"""
-        r = requests.get(self.url, headers={"X-API-Key": PP_KEY})
-        pp_json = r.json()['results'][0]
+        import requests
+        from urlparse import urlparse
 
-        self.chamber = 'house' if pp_json['number'] == 'H' else 'senate'
-        self.session = 2 if datetime.datetime.now().year % 2 == 0 else 1
-        self.bill_id = pp_json['bill_id']
+        host = urlparse(url).netloc
+        self._admit(host)
 
-        # Update self.votes
-        self.get_votes(pp_json['votes'], PP_KEY)
+        for attempt in range(self.attempts):
+            response = None
+            try:
+                response = send()
+            except requests.RequestException:
+                if not idempotent or attempt == self.attempts - 1:
+                    self._record(host, False)
+                    raise
+            else:
+                if response.status_code not in self.RETRY_STATUSES:
+                    self._record(host, True)
+                    return response
+                if attempt == self.attempts - 1 or not (idempotent or response.status_code == 429):
+                    self._record(host, False)
+                    return response
+
+            delay = self._delay(attempt, response)
+            with TRACER.span('retry backoff', url=url, attempt=attempt + 1, seconds=delay):
+                time.sleep(delay)
+
+    def defer(self, item, reason):
+        """
+        Records *item* as given up on for this run, to be reprocessed by a later one
+        """
 
-        self.timeline = self._parse_actions(pp_json['actions'])
-        self.subjects = self.get_subjects(PP_KEY)
-        self.title = pp_json['title']
+        with self._lock:
+            self.deferred.append((item, reason))
+        warn("Deferred {}: {}".format(item, reason))
 
-        # Reddit's max title length is 300
-        if len(self.title) > 250:
-            self.title = self.title[:247] + '...'
 
-        try:
-            self.name = pp_json['bill']
-        except KeyError:  # Catches resolutions, I think.
-            self.name = pp_json['number']
-        self.official_link = pp_json['gpo_pdf_uri']
+RESILIENCE = Resilience()  # Shared by every client in the process, so a host's outage is noticed once
+_session = None  # Created by http_session() on first use
 
-        if self.official_link == "":
-            self.official_link = pp_json['congressdotgov_url']
 
-        self.birthday = parser.parse(pp_json['introduced_date'])
-        self.cosponsors = int(pp_json['cosponsors'])
-        self.sponsor = pp_json['sponsor']
-        self.sponsor_party = pp_json['sponsor_party']
-        self.sponsor_state = pp_json['sponsor_state']
-        # TODO: Pull the full summary using some sort of HTML-to-Markdown conversion scheme
-        self.sparknotes = pp_json['summary_short']
-        self.last_action = datetime.datetime.strptime(pp_json["latest_major_action_date"], "%Y-%m-%d")
-        self.committees = []  # TODO: fill in later when Committee class is complete
+def http_session():
+    """
+    :return: the process-wide requests.Session, which keeps the connections to ProPublica and Reddit open between
+             calls instead of handshaking for every one
+    :rtype: requests.Session
+    """
 
-        """Boolean statuses based on passage dates"""
-        self.passed_house = True if pp_json['house_passage_vote'] else False
-        self.passed_senate = True if pp_json['senate_passage_vote'] else False
-        self.passed = pp_json['enacted'] != ""
-        self.vetoed = pp_json['vetoed'] != ""
+    global _session
+    if _session is None:
+        import requests
+        _session = requests.Session()
+    return _session
 
-        """Status Logic"""
-        if self.passed:
-            self.status = 'passed'
-        if self.vetoed:
-            self.status = 'vetoed'
-        elif self.passed_house and self.passed_senate:
-            self.status = 'passed_congress'
-        elif self.passed_house:
-            self.status = 'passed_house'
-        elif self.passed_senate:
-            self.status = 'passed_senate'
-        else:
-            self.status = 'new'
 
-        """Bill Type Logic"""
-        self.raw_type = pp_json['bill_type']
-        if self.raw_type == 's':
-            self.type = 'senate bill'
-        elif self.raw_type == 'sres':
-            self.type = 'senate res'
-        elif 'jres' in self.raw_type:
-            self.type = 'joint res'
-        elif self.raw_type == 'hr':
-            self.type = 'house bill'
-        else:
-            self.type = 'misc'
+def propublica_get(url, key=None):
+    """
+    GETs a ProPublica Congress API url through the shared retry and circuit-breaker layer
+    :param str url: the API url
+    :param key: the ProPublica API key, from config.ini if not given
+    :return: the parsed JSON body
+    :rtype: dict
+    :raises ProPublicaError: if ProPublica answered with an error
+    :raises CircuitOpenError: if ProPublica has been failing
+    """
 
-    def edit_post(self, client, markdown=None):
+    r = RESILIENCE.call(lambda: http_session().get(url, headers={"X-API-Key": key or pp_key()}), url)
+    if r.status_code != 200:
+        raise ProPublicaError("{} returned {}".format(url, r.status_code))
+    try:
+        body = r.json()
+    except ValueError:
+        raise ProPublicaError("{} returned a non-JSON body".format(url))
+    if body.get('status') == 'ERROR':
+        raise ProPublicaError("{} returned an error: {}".format(url, body.get('errors') or body.get('error')))
+
+    return body
+
+
+# ----------------------------------------------------------------------------------------------------------------------
+
+
+class Persistent:
+    """
+    Mixin for the objects saved as one JSON file at self.json_file (Bill and Vote).
+    Assigning a public attribute marks it dirty, and save() only stages an object that has dirty fields with
+    WRITE_BEHIND, which writes a serialized copy of it when the run flushes - the live object is never converted for
+    serialization. Changes made inside an attribute (appending to a list, merging a Timeline) are not seen by
+    __setattr__ and are marked with touch(). Attributes starting with '_' are bookkeeping, neither tracked nor saved.
+    """
+
+    def __setattr__(self, name, value):
+        if not name.startswith('_'):
+            try:
+                changed = name not in self.__dict__ or self.__dict__[name] != value
+            except TypeError:  # i.e. comparing naive and aware datetimes
+                changed = True
+            if changed:
+                self.__dict__.setdefault('_dirty', set()).add(name)
+        self.__dict__[name] = value
+
+    def touch(self, *names):
         """
-        Updates the Reddit post identified by self.fullname with additional information.
-            Any string argued in str markdown will be appended directly to the end of the Reddit Post with string
-            '**Update**: ' as a header
-        :param str markdown: A string representing the markdown-formatted text we're going to append the post with.
-        :param RedditClient client: a RedditClient object to handle the POST.
-        :return: fullname
+        Marks fields that were changed in place as dirty
         """
 
-        if markdown:
-            text = self.post_body + '\n\n**Update**: ' + markdown
-        else:
-            text = self.post_body
+        self.__dict__.setdefault('_dirty', set()).update(names)
 
-        params = {
-            'api_type': 'json',
-            'text': text,
-            'thing_id': self.fullname
-        }
+    def dirty_fields(self):
+        """
+        :return: the fields changed since the object was loaded or last written
+        :rtype: set
+        """
 
-        append_r = client.request('POST', url='https://oauth.reddit.com/api/editusertext', params=params)
+        return set(self.__dict__.get('_dirty', ()))
 
-        if append_r.status_code == 200:
-            self.post_body = text
-        else:
-            warn("Bill append_post POST request returned {}".format(append_r.status_code))
-            return False
+    def mark_clean(self):
+        """
+        :return: the fields that were dirty
+        :rtype: set
+        """
 
-        """We're going to check here if the bill's flair can change"""
-        self.title_flair(client)
+        return self.__dict__.pop('_dirty', set())
 
-    def decommission(self):
+    def fields(self):
         """
-        Remove this bill from tracking status. When higher-level parsers load this bill, it will be flagged as inactive
+        :return: the public attributes, which are what gets saved
+        :rtype: dict
+        """
+
+        return {name: value for name, value in self.__dict__.iteritems() if not name.startswith('_')}
+
+    def snapshot(self):
+        """
+        :return: the JSON text the object is saved as, serialized from a copy of its fields
+        :rtype: str
+        """
+
+        return json.dumps(self.fields(), default=date_handler)
+
+    def save(self):
+        """
+        Stages the object to be written when WRITE_BEHIND flushes, if anything changed since it was last written
         :return: None
         """
 
-        self.tracking = False
+        if self.dirty_fields():
+            WRITE_BEHIND.stage(self)
 
-    def title_flair(self, client):
-        if len(self.title) < 64:
-            f_params = {
-                'api_type': 'json',
-                'link': self.fullname,
-                'flair_template_id': BILL_FLAIR_ID,
-                'text': self.title
-            }
-            client.request('POST', "https://oauth.reddit.com/r/535/api/selectflair", params=f_params)
-        else:
-            print "title too long"
 
+class WriteBehind:
+    """
+    Collects the Bills and Votes saved during a run and writes them in one batch: each file once however many times
+    its object was saved, each by temp file and rename so a crash never leaves a half-written file, and the search
+    index in one transaction. DailyVotes flushes at the end of its run; atexit flushes whatever a script left staged.
+    """
+
+    def __init__(self):
+        self.pending = {}  # json_file: Bill or Vote
+        self._lock = threading.Lock()
+
+    def stage(self, obj):
+        with self._lock:
+            self.pending[obj.json_file] = obj
 
-class MOC:
-    def __init__(self, key, member_id):
+    def flush(self):
+        """
+        Writes every staged object, and updates the search index and vote archives for them
+        :return: the number of files written
+        :rtype: int
+        """
+
+        with self._lock:
+            pending, self.pending = self.pending, {}
+        if not pending:
+            return 0
+
+        written = []
+        with TRACER.span('write-behind flush', objects=len(pending)):
+            for path, obj in sorted(pending.items()):
+                dirty = obj.mark_clean()  # Before the snapshot, so a change made from here on dirties it again
+                try:
+                    atomic_write(path, encode_document(obj.snapshot()))
+                except (IOError, OSError) as e:
+                    warn("Could not write {}: {}".format(path, e))
+                    obj.touch(*dirty)
+                    self.stage(obj)  # Kept for the next flush
+                    continue
+                written.append(obj)
+
+            SearchIndex.shared().add_many(written)
+            bills = [obj for obj in written if isinstance(obj, Bill)]
+            if bills:
+                repository = BillRepository.shared()
+                for bill in bills:
+                    repository.record(bill)
+                repository.save()
+            votes = [obj for obj in written if isinstance(obj, Vote)]
+            if votes:
+                for vote in votes:
+                    VoteArchive.shared(getattr(vote, 'congress', CURRENT_CONGRESS), vote.chamber).append(vote)
+                    WORKING_SET.remember(vote)
+                VoteDigest.shared().fold_many(votes)
+
+        return len(written)
+
+
+WRITE_BEHIND = WriteBehind()
+atexit.register(WRITE_BEHIND.flush)  # The safety net; runs should still flush themselves when they are done
+
+
+# ----------------------------------------------------------------------------------------------------------------------
+"""What follows is the class hierarchy for the 535 project, currently including Bills, MOCs, and Votes"""
+
+
+class Bill(Persistent):
+    def __init__(self, url=None, file_path=None):
+        """
+        A Bill object that can store amendments, updates, and a time-line. All these arguments are optional, because you
+        :param str url: The ProPublica URL. The class can be created manually via the from_params class
+        """
+
+        """Initialize vars - more for clarity's sake. Most of the actual __init__ assigning will be done via GET or deserialization"""
+
+        self.chamber = self.session = self.bill_id = self.votes = self.timeline = self.subjects = self.title = \
+            self.name = self.official_link = self.birthday = self.cosponsors = self.sponsor_party = self.sponsor = \
+                self.sponsor_state = self.sparknotes = self.last_action = self.committees = self.passed = \
+            self.passed_house = self.passed_senate = self.vetoed = self.status = self.raw_type = self.type = \
+            self.post_body = self.tracking = None
+
+        """Deserializing method"""
+        if file_path:
+            text = read_document(file_path)
+            try:
+                self.__dict__.update(json.loads(text, object_pairs_hook=load_with_datetime))
+                self.mark_clean()  # Only the placeholders above were assigned, and the file has them all
+                return
+            except ValueError:
+                print '{} FILE:'.format(file_path) + text
+                raise
+        else:
+            self.tracking = True  # If constructing from url (not reloading), assume we want to track it.
+            self.url = url  # This shouldn't be overwritten because the filepath option will return before reassignment
+            with TRACER.span('Bill.propublica_pull', url=url):
+                self.propublica_pull()
+
+        """Fullname Placeholder"""
+        self.fullname = None
+
+        """JSON settings"""
+        self.json_file = './bills/' + self.bill_id + '.json'
+
+    def __eq__(self, other):
+        return self.fields() == other.fields()
+
+    def needs_update(self, other):
+        """
+        Different from __eq__ in that this comparison function only checks what we care about - that is, the data that
+        we publish to Reddit. Because most bills we pull down don't have serialization info, they won't be equivalent.
+        :param Bill other: Bill object that has NOT been serialized
+        :return: True if all the following fields match up:
+                    self.title, self.name, self.type, self.birthday, self.status, self.official_link, self.subjects,
+                    self.votes, self.sparknotes, self.timeline(.items())
+        """
+
+        if self.title != other.title:
+            print self.title
+            print other.title
+            return True
+        if self.name != other.name:
+            print self.name
+            print other.name
+            return True
+        if self.type != other.type:
+            print self.type
+            print other.type
+            return True
+        if self.birthday != other.birthday:
+            print self.birthday
+            print other.birthday
+            return True
+        if self.status != other.status:
+            print self.status
+            print other.status
+            return True
+        if self.official_link != other.official_link:  # We just want there to be a source there
+            print self.official_link
+            print other.official_link
+            return True
+        if self.sparknotes != other.sparknotes:
+            return True
+        if self.timeline != other.timeline:
+            return True
+        if self.votes != other.votes:
+            return True
+        return False
+
+    @classmethod
+    def from_params(cls, chamber, bill_id):
+        """
+        Generates the class with parameters instead of a url, constructing the url along the way
+        :param key:
+        :param chamber:
+        :param congress:
+        :param bill_type:
+        :param bill_id:
+        :return:
+        """
+
+        new_bill = cls("https://api.propublica.org/congress/v1/{}/bills/{}.json"
+                                .format(chamber, bill_id))
+
+        return new_bill
+
+    @staticmethod
+    def _parse_actions(actions_list):
+        """
+        Parses the ProPublica JSON object in format list dict (containing a datestamp entry and a description entry)
+        into a Timeline ordered by UTC timestamp
+        :param actions_list:
+        :return: timeline of actions
+        :rtype: Timeline
+        """
+
+        return Timeline(actions_list)
+
+    def get_subjects(self, key):
+        """
+        Asks ProPublica for the bill's subjects. Prefer SubjectCache.lookup, which only asks once per bill.
+        :return: list of subject names, or None if they could not be fetched
+        """
+        # API call parameters. ProPublica bill ids carry the congress, i.e. 'hr1628-115'
+        bill_slug, _, congress = self.bill_id.partition('-')
+        url = "https://api.propublica.org/congress/v1/{}/bills/{}/subjects.json".format(congress or CURRENT_CONGRESS,
+                                                                                        bill_slug)
+
+        # If for any reason we encounter an error getting the subjects, report a miss so it is retried next time
+        try:
+            subject_json = propublica_get(url, key)
+        except (ProPublicaError, CircuitOpenError):
+            return None
+        try:
+            subject_dicts = subject_json['results'][0]['subjects']  # list of dict objects
+        except (KeyError, IndexError):
+            return None
+
+        # We return subjects, instead of mutating self.votes in get_votes, because subjects *should* be static
+        return [subject['name'] for subject in subject_dicts]
+
+    def get_votes(self, votes_json, key):
+        """
+        Gets the detailed vote objects (roll calls) by iterating through the less thorough list included in bill JSON
+        :param votes_json: The section of the bill's JSON that pertains to the votes
+        :param key: the ProPublica API key
+        :return: None
+        """
+
+        votes = []
+
+        if self.votes:
+            # We do not want to overwrite votes that already have a post
+            # Converting changes nothing that is saved: a Vote is written back as the same "<path>" string
+            for vote in self.votes[:]:
+                if type(vote) == unicode:
+                    self.votes[self.votes.index(vote)] = Vote(file_path=str(vote[1:-1]))  # Convert a filepath string to Vote
+
+            stored_ids = [stored_vote.id for stored_vote in self.votes]
+            for vote in votes_json:
+                url = vote['api_url']
+                if url[url.rindex('/') + 1: url.rindex('.')] in stored_ids:  # i.e., if we have the vote logged already
+                    continue
+                else:
+                    # If this is a new vote, we're going to update
+                    self.votes.append(Vote(url, key))
+                    self.touch('votes')  # Appended in place, which __setattr__ does not see
+
+
+        else:
+            self.votes = []
+            for vote in votes_json:
+                self.votes.append(Vote(vote['api_url'], key)) # Votes are only to be created in bills, NOT MOCs.
+
+    def gen_post_body(self, client):
+        """
+        Generates a markdown-formatted post in unicode.
+        :param RedditClient client: Reddit Client to handle vote updates
+        :return: body
+        :rtype: str
+        """
+
+        body = u''  # We will store our markdown body for the post in this variable as the function progresses.
+
+        """Bill headers"""
+        body += u'#{}\n####{}\n\n'.format(self.title, self.name)  # Title of the bill, and the designator as a subtitle
+        body += u'Type: *{}*\n\n'.format(self.type.title())  # String title method (confused me!)
+        body += u'Date Created: {}\n\n'.format(self.birthday)  # Date of creation right under the title
+        body += u'Status: {}\n\n'.format(self.status.replace('_', ' ').title())
+        body += u'######[Link]({})\n'.format(self.official_link)  # Link to official bill info site
+        body += u'\n*****\n\n'  # This string makes a horizontal line
+
+        """Subjects"""
+        body += u'####Subjects: '
+        body += u', '.join(self.subjects) if self.subjects else u'No subjects found.'
+        body += u'\n\n'
+
+        """Committees"""
+        if self.committees:
+            try:
+                referred = [u'[{}]({})'.format(committee.name, committee.url) if committee.url else committee.name
+                            for committee in CommitteeIndex.shared().for_bill(self)]
+            except (ProPublicaError, CircuitOpenError):  # The committee list is context, not worth failing a post over
+                referred = self.committees
+            body += u'####Committees: {}\n\n'.format(u', '.join(referred))
+
+        """Sponsors"""
+        body += u'####Sponsor: {} ({}-{})\n\n'.format(self.sponsor, self.sponsor_party, self.sponsor_state)
+        # TODO: Add cosponsor names? PP API only gives the name of the main sponsor up-front
+
+        """Summary"""
+        body += u'####Summary:\n>{}\n\n'.format(self.sparknotes)
+
+        """Actions"""
+        body += u'##Actions:\nTime|Action\n:---|:---\n'  # Table headers and alignment (both aligned left)
+        body += u''.join(self.timeline.rows())
+        body += u'*All times are in U.S. Eastern.*\n\n'
+
+        """Votes"""
+        body += u'##Roll Call Votes:\n'
+
+        # Most of what the chambers pass are not roll call votes - let's catch and reflect this in the post.
+        if len(self.votes) == 0:
+            body += u'**No roll call vote data available**\n'
+        else:
+            for vote in self.votes:
+
+                if vote.needs_publish():
+                    # If the vote's fullname is not present (or its post is half-finished), the vote needs to be posted
+                    vote.fullname = vote.unicode_post(client)
+                if not vote.fullname:  # Another failure means that the post failed, and the linking needs to be skipped
+                    body += u'{}({})\n\n'.format(vote.question, vote.result)
+                else:
+                    # Post a link for each vote that we just posted
+                    body += u'[{}](https://reddit.com/r/535/comments/{})\n\n'.format(vote.question, vote.fullname[3:])
+
+        self.post_body = body  # For ease-of-access in append_post
+
+    def post(self, client):
+        """
+        Initially post the vote to Reddit.
+        For updates, use "edit_post".
+        :param RedditClient client: a RedditClient
+        :return: response from the reddit API call.
+        :rtype: requests.Response
+        """
+
+        self.gen_post_body(client)
+
+        # Reddit's max title length is 300
+        if len(self.title) > 250:
+            self.title = self.title[:247] + '...'
+
+        """Construct the request"""
+        params = {
+            "kind": "self",
+            "text": self.post_body,
+            "sendreplies": "true",
+            # Capitalize the chamber in the title
+            "title": '[{}]: {}'.format(self.type.upper(), self.title),
+            "sr": "535"
+        }
+
+        url = "https://oauth.reddit.com/api/submit"
+
+        """A bill that was already submitted by a run that died before saving must not be submitted twice"""
+        journal = PublishJournal('bill-' + self.bill_id)
+        fullname = journal.result('submit')
+        if not fullname and journal.begun('submit'):
+            # The last attempt may have reached Reddit without us hearing back; never risk a second post
+            fullname = client.recover_submission(journal, params['title'])
+            if not fullname:
+                return False
+        if fullname:
+            self.fullname = fullname
+            return fullname
+
+        journal.begin('submit')
+        post_r = client.request('POST', url, params=params)
+        """Calmly tell Chuck he's an idiot if he messed something up."""
+        if post_r.status_code != 200:
+            warn("Vote post request returned {}".format(post_r.status_code))
+            if post_r.status_code < 500:
+                journal.abandon('submit')  # Refused outright, so nothing was posted and it is safe to try again
+            return False
+        print post_r.text
+        fullname = 't3_' + re.search('comments\/([a-zA-Z0-9_]*)\/', post_r.text).group(1)  # For future comment+/flair
+        journal.complete('submit', fullname)
+        journal.finish(['submit'])
+
+        self.fullname = fullname
+
+        return fullname
+
+    def save(self):
+        """
+        Stages the bill, and whichever of its votes changed, to be written when WRITE_BEHIND flushes.
+        Datetimes are written in isoformat() by date_handler - they will be re-parsed by the load() pair-catcher
+        :return: None
+        """
+
+        for vote in self.votes or []:
+            if isinstance(vote, Vote):
+                vote.save()
+        Persistent.save(self)
+
+    def load(self):
+        """
+        Deserializes the object's json file at json_file and updates the object's __dict__ directly
+        :return:
+        """
+        self.__dict__ = json.loads(read_document(self.json_file))
+
+    def propublica_pull(self):
+        """
+        Assigns most self variables based on a new json call. Does not edit post-related attrs
+        :return:
+        """
+
+        from dateutil import parser
+
+        """Attributes defined via API call below"""
+        pp_json = propublica_get(self.url)['results'][0]
+
+        self.chamber = 'house' if pp_json['number'] == 'H' else 'senate'
+        self.session = 2 if datetime.datetime.now().year % 2 == 0 else 1
+        self.bill_id = pp_json['bill_id']
+
+        # Update self.votes
+        self.get_votes(pp_json['votes'], pp_key())
+
+        # A refreshed bill only appends the actions it has not seen yet
+        if isinstance(self.timeline, Timeline):
+            if self.timeline.merge(pp_json['actions']):
+                self.touch('timeline')  # Merged in place, which __setattr__ does not see
+        else:
+            self.timeline = self._parse_actions(pp_json['actions'])
+        # Subjects don't change once assigned, so they come from the permanent cache; a miss keeps what we had, unless
+        # all we had was the NO_SUBJECTS placeholder
+        subjects = SubjectCache.shared().lookup(self, pp_key())
+        if subjects or not self.subjects or self.subjects == NO_SUBJECTS:
+            self.subjects = subjects
+        # Reddit's max title length is 300. Each attribute is assigned once, so an unchanged bill stays clean.
+        title = pp_json['title']
+        self.title = title[:247] + '...' if len(title) > 250 else title
+
+        try:
+            self.name = pp_json['bill']
+        except KeyError:  # Catches resolutions, I think.
+            self.name = pp_json['number']
+        self.official_link = pp_json['gpo_pdf_uri'] or pp_json['congressdotgov_url']
+
+        self.birthday = parser.parse(pp_json['introduced_date'])
+        self.cosponsors = int(pp_json['cosponsors'])
+        self.sponsor = pp_json['sponsor']
+        self.sponsor_party = pp_json['sponsor_party']
+        self.sponsor_state = pp_json['sponsor_state']
+        # TODO: Pull the full summary using some sort of HTML-to-Markdown conversion scheme
+        self.sparknotes = pp_json['summary_short']
+        self.last_action = datetime.datetime.strptime(pp_json["latest_major_action_date"], "%Y-%m-%d")
+        self.committees = pp_json.get('committee_codes') or []  # Committee ids, looked up in the CommitteeIndex
+        CommitteeIndex.shared().refer(self)
+
+        """Boolean statuses based on passage dates"""
+        self.passed_house = True if pp_json['house_passage_vote'] else False
+        self.passed_senate = True if pp_json['senate_passage_vote'] else False
+        self.passed = pp_json['enacted'] != ""
+        self.vetoed = pp_json['vetoed'] != ""
+
+        """Status Logic"""
+        if self.passed:
+            self.status = 'passed'
+        if self.vetoed:
+            self.status = 'vetoed'
+        elif self.passed_house and self.passed_senate:
+            self.status = 'passed_congress'
+        elif self.passed_house:
+            self.status = 'passed_house'
+        elif self.passed_senate:
+            self.status = 'passed_senate'
+        else:
+            self.status = 'new'
+
+        """Bill Type Logic"""
+        self.raw_type = pp_json['bill_type']
+        if self.raw_type == 's':
+            self.type = 'senate bill'
+        elif self.raw_type == 'sres':
+            self.type = 'senate res'
+        elif 'jres' in self.raw_type:
+            self.type = 'joint res'
+        elif self.raw_type == 'hr':
+            self.type = 'house bill'
+        else:
+            self.type = 'misc'
+
+    def edit_post(self, client, markdown=None):
+        """
+        Updates the Reddit post identified by self.fullname with additional information.
+            Any string argued in str markdown will be appended directly to the end of the Reddit Post with string
+            '**Update**: ' as a header
+        :param str markdown: A string representing the markdown-formatted text we're going to append the post with.
+        :param RedditClient client: a RedditClient object to handle the POST.
+        :return: True if Reddit accepted the edit, False if it refused it, or None if the edit is still queued
+                (a queued edit that is later refused only warns, and leaves post_body as it was)
+        """
+
+        # An edit still waiting in the client's queue is built on, so a second update does not drop the first
+        base = self.__dict__.get('_edited_body') or self.post_body
+        if markdown:
+            text = base + '\n\n**Update**: ' + markdown
+        else:
+            text = base
+
+        params = {
+            'api_type': 'json',
+            'text': text,
+            'thing_id': self.fullname
+        }
+
+        outcome = []
+
+        def appended(append_r):
+            outcome.append(append_r is not None and append_r.status_code == 200)
+            if outcome[-1]:
+                self.post_body = text
+                self.save()  # A queued edit can land after the caller saved the bill
+            else:
+                if append_r is not None:
+                    warn("Bill append_post POST request returned {}".format(append_r.status_code))
+                if self.__dict__.get('_edited_body') == text:
+                    del self._edited_body  # The next edit builds on what Reddit actually has
+                return
+
+            """We're going to check here if the bill's flair can change"""
+            self.title_flair(client)
+
+        # Body edits are cosmetic, so they wait behind new posts
+        self._edited_body = text
+        client.request('POST', url='https://oauth.reddit.com/api/editusertext', params=params,
+                       priority=PRIORITY_LOW, callback=appended)
+
+        return outcome[0] if outcome else None
+
+    def decommission(self):
+        """
+        Remove this bill from tracking status. When higher-level parsers load this bill, it will be flagged as inactive
+        :return: None
+        """
+
+        self.tracking = False
+
+    def title_flair(self, client):
+        if len(self.title) < 64:
+            f_params = {
+                'api_type': 'json',
+                'link': self.fullname,
+                'flair_template_id': BILL_FLAIR_ID,
+                'text': self.title
+            }
+            client.request('POST', "https://oauth.reddit.com/r/535/api/selectflair", params=f_params,
+                           priority=PRIORITY_LOW)
+        else:
+            print "title too long"
+
+
+class MOC:
+    """
+    A Member of Congress, to include both house reps and senators.
+    Whatever a chamber's members list (or the local roster CSV) already says about a member is set up front; the rest -
+    detail like the birthday and C-SPAN id, the roles, and the vote history - is fetched from ProPublica the first time
+    it is read, and kept on the object from then on.
+    """
+
+    # attribute: field in ProPublica's member detail response
+    DETAIL_FIELDS = {
+        'firstname': 'first_name', 'middle_name': 'middle_name', 'lastname': 'last_name', 'party': 'current_party',
+        'birthday': 'date_of_birth', 'website': 'url', 'rss': 'rss_url', 'cspan_id': 'cspan_id',
+        'icpsr_id': 'icpsr_id', 'thomas_id': 'thomas_id', 'twitter': 'twitter_account',
+        'facebook': 'facebook_account', 'youtube': 'youtube_account'
+    }
+    # attribute: field in a members list entry, or column of {chamber}.csv
+    SUMMARY_FIELDS = dict(DETAIL_FIELDS, party='party', state='state', district='district')
+    VOTE_FIELDS = ('votes', 'total_votes')
+
+    def __init__(self, key=None, member_id=None, summary=None):
+        """
+        :param key: the ProPublica API key, which is not stored in the MOC class
+        :param member_id: the member ID, gained from either a local csv (recommended) or this GET call:
+            GET https://api.propublica.org/congress/v1/{congress}/{chamber}/members.json
+        :param dict summary: the member's entry in that members list (or roster row), which saves the detail call for
+                             every attribute it has
+        """
+
+        self.id = member_id or summary['id']
+        self._key = key
+
+        if summary:
+            for attribute, field in self.SUMMARY_FIELDS.iteritems():
+                if field in summary:
+                    value = summary[field]
+                    self.__dict__[attribute] = None if value in (u'null', u'') else value
+
+    def current_committees(self):
+        """
+        :return: the committees the member sits on now, from the CommitteeIndex rather than the detail call
+        :rtype: list of Committee
+        """
+
+        return CommitteeIndex.shared().for_member(self.id)
+
+    @classmethod
+    def for_chamber(cls, chamber, key=None, congress=CURRENT_CONGRESS, roster=False):
+        """
+        Builds every member of a chamber from one members-list request, instead of a detail request per member
+        :param str chamber: 'house' or 'senate'
+        :param key: the ProPublica API key
+        :param congress: the congress whose members to list
+        :param bool roster: build from the local {chamber}.csv instead, which costs no request at all
+        :return: MOCs by member id
+        :rtype: dict
+        """
+
+        if roster:
+            with open('{}.csv'.format(chamber), 'rb') as csv_file:
+                members = [{field: value.decode('utf-8') for field, value in row.iteritems()}
+                           for row in csv.DictReader(csv_file)]
+        else:
+            members = propublica_get("https://api.propublica.org/congress/v1/{}/{}/members.json"
+                                     .format(congress, chamber), key)['results'][0]['members']
+
+        return {member['id']: cls(key, summary=member) for member in members}
+
+    def __getattr__(self, name):
+        """
+        Fetches the attributes that were not known at construction the first time one of them is read
+        """
+
+        if name in self.DETAIL_FIELDS or name in ('roles', 'committees', 'state', 'district'):
+            self.load_detail()
+        elif name in self.VOTE_FIELDS:
+            self.votes = self.get_votes(self._key)
+        else:
+            raise AttributeError(name)
+
+        return self.__dict__[name]
+
+    def load_detail(self):
+        """
+        Sets every attribute from the member detail call
+        :return: None
+        """
+
+        """Attributes below are derivative of this API call"""
+        pp_json = propublica_get("https://api.propublica.org/congress/v1/members/{}.json"
+                                 .format(self.id), self._key)['results'][0]
+
+        for attribute, field in self.DETAIL_FIELDS.iteritems():
+            setattr(self, attribute, pp_json[field])
+
+        """Congressional Positions"""
+        self.roles = pp_json['roles']
+        self.committees = {entry['congress']: entry['committees'] for entry in pp_json['roles']}
+        current_role = pp_json['roles'][0] if pp_json['roles'] else {}
+        self.__dict__.setdefault('state', current_role.get('state'))
+        self.__dict__.setdefault('district', current_role.get('district'))
+
+    def get_votes(self, key=None):
+        """
+        Generates and returns a list of Vote objects. Also sets total_votes.
+        :param key: the ProPublica API key
+        :return: a list of vote-summary dictionaries in the format:
+                {
+                    "member_id": str,
+                    "chamber": house/senate,
+                    "congress": str of int,
+                    "session": str of int,
+                    "roll_call": str of int,
+                    "bill": {},
+                    "description": str
+                    "question": str,
+                    "datetime": datetime.datetime object
+                    "position": "Yes" or "No" or "Not Voting"
+                }
+        """
+        pp_json = propublica_get("https://api.propublica.org/congress/v1/members/{}/votes.json"
+                                 .format(self.id), key)['results']
+
+        self.total_votes = pp_json['total_votes']
+        votes = pp_json['votes']
+
+        """Adjust the format to match Python datetime object"""
+        for vote in votes:
+            vote.update({'datetime': billtime(vote, raw=True)})
+            del vote['date']
+            del vote['time']
+
+        return votes
+
+
+class Vote(Persistent):
+    def __init__(self, url=None, key=None, file_path=None):
+        """
+        Generates a Vote object
+        :param congress: The string representing the current congress - i.e.'115' for the current one (2017)
+        :param chamber: The stirng 'house' or 'senate'
+        :param rc_id: A ProPublica roll-call ID
+        :param file_path: a filepath to a JSON-serialized Vote object
+        :param key:
+        """
+
+        """Deserialize a JSON if file_path exists"""
+        if file_path:
+            self.__dict__ = self.unpack(json.loads(read_document(file_path)))
+            return
+
+        self.id = url[url.rindex('/') + 1: url.rindex('.')]
+
+        # Raises ProPublicaError (rather than a KeyError further down) if ProPublica answers with an error
+        with TRACER.span('Vote.__init__', vote=self.id, url=url):
+            pp_json = propublica_get(url, key)['results']
+        vote_json = pp_json['votes']['vote']
+
+        self.congress = str(vote_json['congress'])
+        self.session = int(vote_json['session'])
+        self.question = vote_json['question']
+        self.description = vote_json['description']
+        self.type = vote_json['vote_type']
+        self.datetime = billtime(vote_json, raw=True)
+        self.result = vote_json['result']
+        self.chamber = vote_json['chamber'][0].lower() + vote_json['chamber'][1:]
+        self.positions = vote_json['positions']
+        self.republican_summary = vote_json['republican']
+        self.democratic_summary = vote_json['democratic']
+        self.independent_summary = vote_json['independent']
+        self.fullname = None
+
+        """JSON settings"""
+        self.json_file = './votes/' + self.unique_id() + '.json'  # Votes saved before this are in ./votes/house76.json
+
+        try:
+            self.title = vote_json['bill']['bill_id'].upper()
+            self.bill_name = vote_json['bill']['title']
+        except KeyError:
+            self.bill_name = "Non-Bill Measure"
+            self.title = self.question
+
+    @classmethod
+    def from_params(cls, congress, chamber, rc_id, key):
+        session = 2 if datetime.datetime.now().year % 2 == 0 else 1
+        new_vote = cls("https://api.propublica.org/congress/v1/{}/{}/sessions/{}/votes/{}.json" \
+            .format(congress, chamber, session, rc_id), key)
+        return new_vote
+
+    def __getitem__(self, key):
+        return self.__dict__[key]
+
+    def unique_id(self):
+        """
+        Roll call numbers restart every session, so a vote is only unique by congress, session, chamber and number
+        :return: i.e. '115-1-house76'
+        :rtype: str
+        """
+
+        return '{}-{}-{}{}'.format(self.__dict__.get('congress', ''), self.session, self.chamber, self.id)
+
+    def journal(self):
+        """
+        :return: the PublishJournal that tracks this vote's Reddit post
+        :rtype: PublishJournal
+        """
+
+        return PublishJournal('vote-' + self.unique_id())
+
+    def needs_publish(self):
+        """
+        A vote needs (re)publishing if it was never posted, or if a previous attempt stopped partway through.
+        Votes posted before the journal existed have a fullname and no journal, and are left alone.
+        :return: True if unicode_post still has work to do
+        """
+
+        if not self.fullname:
+            return True
+        journal = self.journal()
+        return journal.exists() and not journal.finished
+
+    def json_dump(self):
+        """
+        Serialize the object as a json object. Dump it instead of saving it to a file
+        :return: None
+        """
+
+        with open(self.json_file, 'w') as data_file:
+            json.dumps(self.__dict__, default=date_handler)
+
+    def load(self):
+        """
+        Deserializes the object's json file at json_file and updates the object's __dict__ directly
+        :return:
+        """
+        self.__dict__ = self.unpack(json.loads(read_document(self.json_file)))  # Read like Vote(file_path=...)
+
+    def snapshot(self):
+        """
+        :return: the JSON text the vote is saved as, with its positions packed into columns
+        :rtype: str
+        """
+
+        fields = self.fields()
+        fields['positions'] = self.pack_positions(self.positions)
+        return json.dumps(fields, default=date_handler)
+
+    @staticmethod
+    def pack_positions(positions):
+        """
+        Packs the position dicts into one list of keys and a row of values per member, so the ~435 copies of the same
+        six keys are written once
+        :rtype: dict
+        """
+
+        columns = sorted(set(key for position in positions for key in position))
+        return {'columns': columns, 'rows': [[position.get(key) for key in columns] for position in positions]}
+
+    @staticmethod
+    def unpack(fields):
+        """
+        :param dict fields: a saved vote's fields, with its positions either packed or as saved before packing
+        :return: *fields*, with the positions as dicts again
+        """
+
+        positions = fields.get('positions')
+        if isinstance(positions, dict):
+            columns = positions['columns']
+            fields['positions'] = [dict(zip(columns, row)) for row in positions['rows']]
+        return fields
+
+    def render(self):
+        """
+        Builds everything unicode_post sends to Reddit, without sending anything.
+        A finished roll call never changes, so the result is kept in the RenderCache and only built again once the
+        template or the chamber's roster changes.
+        :return: dict with the post 'title' and 'text', the House member-list 'comments' (empty for the Senate, whose
+                 members fit in the post itself) and the 'flair' template id (None on a tie)
+        :rtype: dict
+        """
+
+        cache = RenderCache.shared()
+        version = cache.version(Roster.load(self.chamber))
+        rendered = cache.get(self, version)
+        if rendered is None:
+            with TRACER.span('render', vote=self.id, chamber=self.chamber):
+                rendered = self._render()
+            cache.put(self, version, rendered)
+
+        return rendered
+
+    def _render(self):
+        """
+        Builds the render() output from scratch
+        :rtype: dict
+        """
+
+        text = u""""""
+
+        text += u'#Subject: "{}"\n'.format(self.description)
+        text += u'**Time: {}**\n\n'.format(self.datetime)
+        text += u'**Result: {}**\n\n'.format(self.result)
+        text += u'###Vote Summary:\n\n'
+
+        """Add rollcall by party"""
+        for party in ['independent', 'democratic', 'republican']:
+            text += u"**{}:**\n\n".format(party.title())
+            for position, count in self['{}_summary'.format(party)].items():
+                if position in ['majority_position', 'present']:
+                    continue  # Not neccessary to convey this information
+                text += '*{}*: {}\n'.format(position.replace('_', ' ').title(), count)
+            text += '\n'
+
+        """Look up each member's preformatted label to determine who voted on what side"""
+        roll = {'Yes': [], 'No': [], 'Not Voting': []}
+        roster = Roster.load(self.chamber)
+
+        for member in self.positions:
+            roll.setdefault(member['vote_position'], []).append(roster.label(member))
+
+        ordered_roll = sorted(roll.items(), key=lambda x: len(x[1]), reverse=True)  # Sorts by popularity of position
+
+        """Add our roll to the bottom of the file"""
+
+        if self.chamber == 'house':  # Request sizes made with the entire house are typically too large, so we'll put that in comments.
+            comments = pack_comments(ordered_roll)
+        else:
+            comments = []
+            text += u"###Votes by Member\n\n"
+            for position, members in ordered_roll:
+                text += u'**{}({}):**\n\n'.format(position, len(members))
+                text += u''.join(member + u'; \n' for member in members)
+                text += u'\n\n'
+
+        # Reddit's max title length is 300
+        if len(self.bill_name) > 200:
+            billname = self.bill_name[:197] + '...'
+        else:
+            billname = self.bill_name
+        if len(self.question) > 50:
+            question = self.question[:47] + '...'
+        else:
+            question = self.question
+
+        # Capitalize the chamber in the title
+        title = u'{} Vote: {}; {}'.format(self.chamber[:1].upper() + self.chamber[1:], billname, question)
+
+        # Determine which flair to apply
+        if len(roll['Yes']) > len(roll['No']):
+            flair = VOTE_PASS_FLAIR_ID
+        elif len(roll['No']) > len(roll['Yes']):
+            flair = VOTE_FAIL_FLAIR_ID
+        else:
+            flair = None
+
+        return {'title': title, 'text': text, 'comments': comments, 'flair': flair}
+
+    # TODO: Move the reddit functions we do here (comment, flair, and hide) to the client object.
+    def unicode_post(self, client, rendered=None):
+        """
+        post...but in unicode! yay.
+        :param client:
+        :param dict rendered: this vote's render() output, if it was already rendered elsewhere
+        :return: the fullname of the link, or False if an error prevented completion.
+                Note that an error will not raise; this function only warns() as of now.
+                Every completed Reddit call is recorded in the vote's PublishJournal, so calling this again after a
+                failure only makes the calls that are still missing.
+                The flair and removal are queued at low priority, and sent when the client has spare budget or is
+                closed (at the latest, at interpreter exit).
+        """
+
+        journal = self.journal()
+        if journal.finished:
+            return journal.result('submit')
+
+        rendered = rendered or self.render()
+
+        url = "https://oauth.reddit.com/api/submit"
+
+        params = {
+            "kind": "self",
+            "text": rendered['text'],
+            "sendreplies": "true",
+            "title": rendered['title'],
+            "sr": "535"
+        }
+        fullname = journal.result('submit')
+        if not fullname and journal.begun('submit'):
+            # The last attempt may have reached Reddit without us hearing back; never risk a second post
+            fullname = client.recover_submission(journal, params['title'])
+            if not fullname:
+                return None
+        if not fullname:
+            journal.begin('submit')
+            post_r = client.request('POST', url, params=params)
+
+            """Calmly tell Chuck he's an idiot if he messed something up."""
+            if post_r.status_code != 200:
+                warn("Vote post request returned {}".format(post_r.status_code))
+                print post_r.text
+                if post_r.status_code < 500:
+                    journal.abandon('submit')  # Refused outright, so nothing was posted and it is safe to try again
+                return None
+            fn_search = re.search('comments\/([a-zA-Z0-9_]*)\/', post_r.text)
+            if not fn_search:
+                print "No fullname regexed, retrying"
+                print self.question
+                print post_r.text
+                return None
+            else:
+                fullname = 't3_' + fn_search.group(1)  # For future comment+/flair
+            journal.complete('submit', fullname)
+
+        steps = ['submit', 'flair', 'remove']
+
+        """If we are dealing with a House of Representatives post, we are going to post the positions as comments"""
+        # General comment params:
+        c_params = {
+            'api_type': 'json',
+            'thing_id': fullname
+        }
+        for i, data in enumerate(rendered['comments']):
+            step = 'comment:{}'.format(i)
+            steps.append(step)
+            if journal.done(step):
+                continue
+            journal.begin(step)
+            c_params.update(text=data)
+            comment_r = client.request('POST', 'https://oauth.reddit.com/api/comment', params=c_params)
+            if comment_r.status_code != 200:
+                warn("House comment follow-up POST returned {}".format(comment_r.status_code))
+            else:
+                journal.complete(step)
+
+        """FLAIR THE VOTE"""
+
+        furl = "https://oauth.reddit.com/r/535/api/selectflair"
+        f_params = {
+            'api_type': 'json',
+            'link': fullname,
+            'flair_template_id': rendered['flair']
+        }
+
+        def flaired(flair_r):
+            # Warn Chuck if he is an idiot
+            if flair_r is None:  # Never sent
+                journal.release('flair')
+            elif flair_r.status_code != 200:
+                warn("Vote flair POST returned {}".format(flair_r.status_code))
+                journal.release('flair')
+            else:
+                journal.complete('flair')
+                journal.finish(steps)
+
+        # Apply the flair. A tie has no flair, so there is nothing to send.
+        if not rendered['flair']:
+            journal.complete('flair')
+        elif not journal.done('flair') and not journal.queued('flair'):
+            journal.queue('flair')
+            # Flair and removal are cosmetic, so they yield to new posts and go out when the client has spare budget
+            client.request('POST', furl, params=f_params, priority=PRIORITY_LOW, callback=flaired)
+
+        """Finally, remove the post so it only shows up in links"""
+        h_params = {
+            'id': fullname,
+            'spam': 'false'
+        }
+        hurl = 'https://oauth.reddit.com/api/remove'
+
+        def removed(hide_r):
+            if hide_r is None:  # Never sent
+                journal.release('remove')
+            elif hide_r.status_code != 200:
+                warn("Abnormal code {} for hide POST".format(hide_r.status_code))
+                journal.release('remove')
+            else:
+                journal.complete('remove')
+                journal.finish(steps)
+
+        if not journal.done('remove') and not journal.queued('remove'):
+            journal.queue('remove')
+            client.request('POST', hurl, params=h_params, priority=PRIORITY_LOW, callback=removed)
+
+        journal.finish(steps)
+
+        return fullname
+
+
+class Committee:
+    """
+    A committee of Congress and its current members
+    """
+
+    def __init__(self, entry, member_ids=()):
+        """
+        :param dict entry: the committee's entry in ProPublica's committee list, or a Committee's to_json()
+        :param member_ids: the ids of its current members
+        """
+
+        self.id = entry['id']
+        self.name = entry['name']
+        self.chamber = entry['chamber']
+        self.url = entry.get('url')
+        self.chair_id = entry.get('chair_id')
+        self.ranking_member_id = entry.get('ranking_member_id')
+        self.subcommittees = [sub['id'] if isinstance(sub, dict) else sub for sub in entry.get('subcommittees', [])]
+        self.member_ids = list(entry.get('member_ids', member_ids))
+
+    def to_json(self):
+        return {'id': self.id, 'name': self.name, 'chamber': self.chamber, 'url': self.url, 'chair_id': self.chair_id,
+                'ranking_member_id': self.ranking_member_id, 'subcommittees': self.subcommittees,
+                'member_ids': self.member_ids}
+
+
+class CommitteeIndex:
+    """
+    Every committee of a congress and its membership, with the indexes committee -> members, member -> committees and
+    bill -> referred committees, so posts and member pages get committee context from dict lookups.
+    Each chamber's (and the joint) committees come from one list call plus one call per committee for its members,
+    and are cached under COMMITTEE_CACHE_DIRECTORY for COMMITTEE_TTL seconds. Chambers are loaded on first use.
+    """
+
+    CHAMBERS = ['house', 'senate', 'joint']
+    WORKERS = 8  # Concurrent membership calls while refreshing a chamber
+
+    _shared = {}  # congress: CommitteeIndex
+
+    def __init__(self, congress=CURRENT_CONGRESS, directory=COMMITTEE_CACHE_DIRECTORY, ttl=COMMITTEE_TTL):
+        """
+        :param congress: the congress whose committees to index
+        :param str directory: where each chamber's committees are cached
+        :param ttl: seconds a cached chamber is used before it is fetched again
+        """
+
+        self.congress = congress
+        self.directory = directory
+        self.ttl = ttl
+        if not os.path.exists(self.directory):
+            os.makedirs(self.directory)
+
+        self.committees = {}  # committee_id: Committee
+        self.by_member = {}  # member_id: set of committee_ids
+        self.by_bill = {}  # bill_id: committee_ids the bill was referred to
+        self.bills_by_committee = {}  # committee_id: set of bill_ids
+        self.loaded = set()  # Chambers indexed so far
+        self._lock = threading.Lock()
+
+    @classmethod
+    def shared(cls, congress=CURRENT_CONGRESS):
+        """
+        :return: the process-wide index of *congress*'s committees
+        :rtype: CommitteeIndex
+        """
+
+        if congress not in cls._shared:
+            cls._shared[congress] = cls(congress)
+        return cls._shared[congress]
+
+    def path(self, chamber):
+        return os.path.join(self.directory, '{}{}.json'.format(self.congress, chamber))
+
+    def fetch(self, chamber):
+        """
+        Asks ProPublica for a chamber's committees and their current members
+        :rtype: list of Committee
+        """
+
+        from multiprocessing.dummy import Pool
+
+        api = "https://api.propublica.org/congress/v1/{}/{}/committees".format(self.congress, chamber)
+        entries = propublica_get(api + '.json')['results'][0]['committees']
+
+        def members(entry):
+            detail = propublica_get('{}/{}.json'.format(api, entry['id']))['results'][0]
+            return [member['id'] for member in detail.get('current_members') or []]
+
+        pool = Pool(self.WORKERS)
+        try:
+            memberships = pool.map(members, entries)
+        finally:
+            pool.close()
+
+        return [Committee(entry, member_ids) for entry, member_ids in zip(entries, memberships)]
+
+    def load(self, chamber):
+        """
+        Indexes a chamber's committees, from the cache while it is fresh and from ProPublica otherwise
+        :return: None
+        """
+
+        with self._lock:
+            if chamber in self.loaded:
+                return
+
+            path = self.path(chamber)
+            if os.path.exists(path) and time.time() - os.path.getmtime(path) < self.ttl:
+                with open(path, 'r') as cache_file:
+                    committees = [Committee(entry) for entry in json.load(cache_file)]
+            else:
+                with TRACER.span('committee fetch', chamber=chamber):
+                    committees = self.fetch(chamber)
+                atomic_write(path, json.dumps([committee.to_json() for committee in committees]))
+
+            for committee in committees:
+                self.committees[committee.id] = committee
+                for member_id in committee.member_ids:
+                    self.by_member.setdefault(member_id, set()).add(committee.id)
+            self.loaded.add(chamber)
+
+    def load_all(self):
+        for chamber in self.CHAMBERS:
+            self.load(chamber)
+
+    def get(self, committee_id):
+        """
+        :return: the committee, or None if there is no such committee
+        :rtype: Committee
+        """
+
+        self.load_all()
+        return self.committees.get(committee_id)
+
+    def members(self, committee_id):
+        """
+        :return: the ids of the committee's current members
+        :rtype: list
+        """
+
+        committee = self.get(committee_id)
+        return committee.member_ids if committee else []
+
+    def for_member(self, member_id):
+        """
+        :return: the committees *member_id* sits on
+        :rtype: list of Committee
+        """
+
+        self.load_all()
+        return [self.committees[committee_id] for committee_id in sorted(self.by_member.get(member_id, ()))]
+
+    def refer(self, bill):
+        """
+        Records which committees *bill* was referred to
+        :param Bill bill: a bill with committees set to its committee ids
+        """
+
+        for committee_id in self.by_bill.get(bill.bill_id, []):
+            self.bills_by_committee[committee_id].discard(bill.bill_id)
+        self.by_bill[bill.bill_id] = list(bill.committees or [])
+        for committee_id in self.by_bill[bill.bill_id]:
+            self.bills_by_committee.setdefault(committee_id, set()).add(bill.bill_id)
+
+    def for_bill(self, bill):
+        """
+        :return: the committees *bill* was referred to; ids this congress has no committee for are left out
+        :rtype: list of Committee
+        """
+
+        self.refer(bill)
+        self.load_all()
+        return [self.committees[committee_id] for committee_id in self.by_bill[bill.bill_id]
+                if committee_id in self.committees]
+
+    def bills(self, committee_id):
+        """
+        :return: the ids of the referred bills seen so far
+        :rtype: set
+        """
+
+        return self.bills_by_committee.get(committee_id, set())
+
+
+class RedditClient:
+    """
+    Class representing a Reddit Client for the CongressionalRobot
+    """
+
+    IDEMPOTENT_ENDPOINTS = ['selectflair', 'remove', 'editusertext']  # POSTs that are safe to repeat
+    _open = set()  # Clients not yet closed
+
+    def __init__(self, usn, pw, limit=60, reserve=10, token_cache=None, budget=None, **agents_and_ids):
+        """
+        Nothing is sent to Reddit here; the OAuth token is requested by the first call to request(), so a run that
+        turns out to have no work never pays for the auth round trip. Tokens are shared with other processes through
+        the TokenCache, and are replaced in the background shortly before they expire.
+        :param int limit: requests allowed per minute
+        :param int reserve: requests per minute that low-priority calls may not use, kept free for new posts
+        :param TokenCache token_cache: where OAuth tokens are shared between runs
+        :param RateBudget budget: the request budget shared with every other client on this host
+        """
+
+        self.header = {}
+        self.header_exp = datetime.datetime.now()  # set as "expired" by default
+        self.agents_and_ids = agents_and_ids  # Held until the first request needs a token
+        self.token_cache = token_cache or TokenCache()
+        self._refresh_timer = None
+        self._open.add(self)  # Closed at interpreter exit by close_all()
+
+        self.limit = limit  # Reddit standard is 60 requests/min
+        self.reserve = reserve
+
+        # Every client and process on the host draws from the same budget, so together they never exceed the limit
+        self.budget = budget or RateBudget(limit=limit)
+
+        self.deferred = deque()  # Low-priority requests waiting for spare budget: (verb, url, callback, options)
+
+        # This Client needs to store its credentials to ensure constant service
+        self.username = usn
+        self.password = pw
+
+    def authorize(self, username, password, user_agent="python:CongressionalRobot:v0.0.1", app_id="BQ6EuAzmCd3JkQ",
+                  app_secret="0_DiQkyZssMwE2mw-nHP-aswWek"):
+        """
+        Secure a temporary OAuth token from the Reddit API. This is good for 3600 seconds
+        :param app_id: Public ID for the Reddit app
+        :param username: Reddit account username
+        :param password: Reddit account password
+        :param user_agent: Name of the Reddit app, should be modeled for "CongressionalRobot"
+        :param app_secret: the secret key for the app. DO NOT SHARE THIS WITH ANYONE OUTSIDE OF THE 535 PROJECT
+
+        :return: a dictionary header for requests that includes the OAuth token
+        :rtype: dict
+        """
+
+        import requests.auth
+
+        url = "https://www.reddit.com/api/v1/access_token"
+
+        client_auth = requests.auth.HTTPBasicAuth(app_id, app_secret)
+        post_data = {"grant_type": "password", "username": username, "password": password}
+        headers = {"User-Agent": "{} (by /u/{})".format(user_agent, username)}
+        response = RESILIENCE.call(lambda: http_session().post(url, auth=client_auth, data=post_data, headers=headers),
+                                   url)
+
+        # Sample response JSON:
+        #  {u'access_token': u'XXXXXXXXXXXXXXXXX', u'token_type': u'bearer', u'expires_in': 3600, u'scope': u'*'}
+
+        token = response.json()
+        expires_at = time.time() + token['expires_in']
+        self.token_cache.store(username, token['access_token'], expires_at)
+        self._use_token(token['access_token'], expires_at)
+
+        return self.header
+
+    def _use_token(self, access_token, expires_at):
+        """
+        Switches the client to *access_token* and schedules its replacement shortly before *expires_at*
+        """
+
+        self.header = {"Authorization": "bearer {}".format(access_token),
+                       "User-Agent": "python:CongressionalRobot:v0.0.2 (by /u/theChuck-Truck)"}
+        self.header_exp = datetime.datetime.fromtimestamp(expires_at)
+
+        if self._refresh_timer:
+            self._refresh_timer.cancel()
+        self._refresh_timer = threading.Timer(max(expires_at - TOKEN_REFRESH_MARGIN - time.time(), 0),
+                                              self._refresh_in_background)
+        self._refresh_timer.daemon = True  # Never keeps a finished run alive
+        self._refresh_timer.start()
+
+    def token_expiring(self):
+        """
+        :return: True if there is no token, or the current one expires within TOKEN_REFRESH_MARGIN
+        """
+
+        margin = datetime.timedelta(seconds=TOKEN_REFRESH_MARGIN)
+        return not self.header or datetime.datetime.now() >= self.header_exp - margin
+
+    def refresh(self, force=False):
+        """
+        Makes sure the client holds a token that is not about to expire. A fresh token already cached by another
+        process is reused; only if there is none does this authorize. The cache is locked meanwhile, so concurrent
+        processes never authorize at the same time.
+        :param force: authorize even if the cached token looks valid (i.e. Reddit just rejected it)
+        """
+
+        with self.token_cache.lock():
+            cached = self.token_cache.get(self.username)
+            if not force and cached and cached['expires_at'] - TOKEN_REFRESH_MARGIN > time.time():
+                self._use_token(cached['access_token'], cached['expires_at'])
+            else:
+                self.authorize(self.username, self.password, **self.agents_and_ids)
+
+    def close(self):
+        """
+        Sends every queued low-priority request, then stops the background token refresh. Runs automatically at
+        interpreter exit, so queued flair and edits are not lost when a script ends without flushing.
+        """
+
+        try:
+            self.flush()
+        except Exception as e:  # i.e. CircuitOpenError; the journals let the next run send what is left
+            warn("{} queued Reddit requests were not sent: {}".format(len(self.deferred), e))
+            while self.deferred:
+                _, _, callback, _ = self.deferred.popleft()
+                if callback:
+                    callback(None)  # Lets the caller release whatever it was holding for the request
+
+        if self._refresh_timer:
+            self._refresh_timer.cancel()
+            self._refresh_timer.join()
+            self._refresh_timer = None
+        self._open.discard(self)
+
+    @classmethod
+    def close_all(cls):
+        """
+        Closes every open client. Registered once with atexit.
+        """
+
+        for client in list(cls._open):
+            client.close()
+
+    def _refresh_in_background(self):
+        try:
+            self.refresh()
+        except Exception as e:  # The next request will try again in the foreground
+            warn("Background token refresh failed: {}".format(e))
+
+    def recover_submission(self, journal, title, limit=100):
+        """
+        Settles a submission that *journal* shows as begun but never accepted, without submitting it again: the
+        account's newest submissions are searched for *title*, and if one is found its fullname is recorded as the
+        submit's result. If none is found the submission is held; later runs search again, and deleting the journal
+        file lets it be submitted again once someone has checked it never went up.
+        :param PublishJournal journal: the journal of the post
+        :param str title: the title the post was submitted with
+        :return: the submission's fullname, or None if it was not found
+        """
+
+        listing_r = self.request('GET', 'https://oauth.reddit.com/user/{}/submitted'.format(self.username),
+                                 params={'sort': 'new', 'limit': limit, 'raw_json': 1})
+        if listing_r.status_code == 200:
+            for child in listing_r.json()['data']['children']:
+                if child['data']['title'].strip() == title.strip():
+                    journal.complete('submit', child['data']['name'])
+                    return child['data']['name']
+
+        warn("{} was submitted without being confirmed, and no submission titled {!r} was found (listing returned "
+             "{}); holding it for review instead of posting it again. Delete {} to resubmit it."
+             .format(journal.key, title, listing_r.status_code, journal.path))
+        return None
+
+    def spare(self):
+        """
+        :return: how many more requests in the current minute can be spent on low-priority calls
+        :rtype: int
+        """
+
+        return self.budget.remaining() - self.reserve
+
+    def request(self, verb, url, priority=PRIORITY_HIGH, callback=None, **options):
+        """
+        Makes a requests.get request with the argued options.
+        Note that the OAuth headers are automatically passed and don't need to be argued
+        :param verb: one of these RESTful verbs:
+                GET, PUT, POST, DELETE
+        :param url: the url to GET from
+        :param priority: PRIORITY_HIGH to send now, or PRIORITY_LOW to queue the call until there is spare budget
+        :param callback: called with the response once a queued call is finally sent, or with None if the client
+                is closed without managing to send it
+        :param options: key/value pairs of requests
+        :return: the response, or None if the call was queued
+        """
+
+        """Validate Inputs"""
+        verb = verb.upper()
+        assert verb in ['GET', 'POST', 'PUT', 'DELETE']
+
+        if priority == PRIORITY_LOW:
+            self.deferred.append((verb, url, callback, options))
+            try:
+                self.flush(spare_only=True)
+            except Exception as e:  # The calls stay queued for the next flush; this one was only opportunistic
+                warn("Queued Reddit requests could not be sent yet: {}".format(e))
+            return None
+
+        r = self._send(verb, url, **options)
+        if callback:
+            callback(r)
+
+        return r
+
+    def flush(self, spare_only=False):
+        """
+        Sends queued low-priority requests, oldest first.
+        A request that raises (i.e. CircuitOpenError, or a connection error that outlasted the retries) stays at the
+        front of the queue, and the exception is passed on.
+        :param spare_only: stop once the minute's spare budget is used up instead of waiting for more
+        :return: the number of requests still queued
+        :rtype: int
+        """
+
+        while self.deferred:
+            if spare_only and self.spare() <= 0:
+                break
+            verb, url, callback, options = self.deferred[0]
+            r = self._send(verb, url, **options)
+            self.deferred.popleft()  # Only once it was sent
+            if callback:
+                callback(r)
+
+        return len(self.deferred)
+
+    def _send(self, verb, url, retry_auth=True, **options):
+        """
+        Sends one request right away, waiting first if the shared budget is spent
+        :rtype: requests.Response
+        """
+
+        """Check auth"""
+        if self.token_expiring():
+            self.refresh()
+
+        endpoint = url.rstrip('/').rsplit('/', 1)[-1]
+        session = http_session()
+
+        def send():
+            """Take a request from the shared budget (every retry too), waiting if the last minute's is spent"""
+            self.budget.acquire()
+
+            if verb == 'GET':
+                return session.get(url, headers=self.header, **options)
+            elif verb == 'POST':
+                return session.post(url, headers=self.header, **options)
+            elif verb == 'PUT':
+                return session.put(url, headers=self.header, **options)
+            elif verb == 'DELETE':
+                return session.delete(url, headers=self.header, **options)
+
+            else:
+                raise ValueError("Invalid verb argument: {}".format(verb))
+
+        # Spans are named after the endpoint (submit, comment, selectflair, remove, ...) and carry the thing it targets
+        params = options.get('params') or {}
+        with TRACER.span(endpoint, verb=verb, url=url,
+                         thing=params.get('thing_id') or params.get('link') or params.get('id')) as span:
+            # Submissions and comments are only retried when Reddit refused them outright, never after a 5xx that
+            # may have gone through
+            r = RESILIENCE.call(send, url, idempotent=verb != 'POST' or endpoint in self.IDEMPOTENT_ENDPOINTS)
+            span['status'] = r.status_code
+
+        # A token revoked early (or replaced by another login) is renewed once, rather than failing the call
+        if r.status_code == 401 and retry_auth:
+            self.refresh(force=True)
+            return self._send(verb, url, retry_auth=False, **options)
+
+        return r
+
+
+# Registered after WRITE_BEHIND.flush, so it runs first and the bills that queued edits touch are still written
+atexit.register(RedditClient.close_all)
+
+
+class VoteArchive:
+    """
+    An append-only binary archive of one chamber's roll calls in one congress, for analysis that has to scan a whole
+    congress without opening thousands of vote files.
+    {congress}{chamber}.rc holds one fixed-width record per roll call: its metadata and a packed array with one
+    position code per member slot. {congress}{chamber}.idx.json holds the member table (slot -> member id) and the
+    offset index (vote key -> record number). Because records are fixed width, the file can be memory-mapped and read
+    as a NumPy structured array without copying or parsing anything.
+    DailyVotes and WatchVotes may append to the same archive, so appends hold a lock file across processes and re-read
+    the index before writing.
+    """
+
+    VERSION = 2
+    # Every House seat and delegate (441) plus 71 replacements over a congress - special elections and appointments
+    MEMBER_SLOTS = 512
+
+    """Position codes. 0 means the slot's member did not vote on (or was not seated for) the roll call"""
+    POSITIONS = ['', 'Yes', 'No', 'Not Voting', 'Present', 'Other']
+    POSITION_CODES = {position: code for code, position in enumerate(POSITIONS)}
+
+    # vote key, bill, session, passed, roll call, timestamp, yes, no, not voting, present, members, positions
+    RECORD = struct.Struct('<12s16sBBIqHHHHH{}s'.format(MEMBER_SLOTS))
+    DTYPE = [('vote_key', 'S12'), ('bill', 'S16'), ('session', 'u1'), ('passed', 'u1'), ('roll_call', '<u4'),
+             ('timestamp', '<i8'), ('yes', '<u2'), ('no', '<u2'), ('not_voting', '<u2'), ('present', '<u2'),
+             ('members', '<u2'), ('positions', 'u1', (MEMBER_SLOTS,))]
+
+    _shared = {}  # (directory, congress, chamber): VoteArchive
+
+    def __init__(self, congress, chamber, directory=ARCHIVE_DIRECTORY):
+        """
+        :param str congress: i.e. '115'
+        :param str chamber: 'house' or 'senate'
+        :param str directory: the folder the archive files are kept in
+        """
+
+        self.congress = str(congress)
+        self.chamber = chamber
+        self.path = os.path.join(directory, '{}{}.rc'.format(congress, chamber))
+        self.index_path = os.path.join(directory, '{}{}.idx.json'.format(congress, chamber))
+
+        self.member_ids = []  # Slot number: member id
+        self.offsets = {}  # Vote key: record number
+        self.slots = {}  # Member id: slot number
+
+        try:
+            os.makedirs(directory)
+        except OSError:
+            if not os.path.isdir(directory):
+                raise
+
+        with self.lock():
+            self._reload()
+
+    @contextmanager
+    def lock(self):
+        """
+        Holds an exclusive lock on the archive across processes while it is read and appended to
+        """
+
+        import fcntl
+
+        fd = os.open(self.path + '.lock', os.O_RDWR | os.O_CREAT, 0644)
+        try:
+            fcntl.flock(fd, fcntl.LOCK_EX)
+            yield
+        finally:
+            fcntl.flock(fd, fcntl.LOCK_UN)
+            os.close(fd)
+
+    def _reload(self):
+        """
+        Reads the index, which another process may have appended to since. Call with the lock held.
+        """
+
+        self.member_ids, self.offsets = [], {}
+        if os.path.exists(self.index_path):
+            with open(self.index_path, 'r') as index_file:
+                index = json.load(index_file)
+            if index['version'] != self.VERSION:
+                # Records of another version have another width. The archive is only ever built from the vote files,
+                # so the old one is set aside and ArchiveVotes.py rebuilds it
+                warn("{} is archive version {}, expected {}; setting it aside. Run ArchiveVotes.py to rebuild it."
+                     .format(self.index_path, index['version'], self.VERSION))
+                for path in (self.path, self.index_path):
+                    if os.path.exists(path):
+                        os.rename(path, '{}.v{}'.format(path, index['version']))
+                return self._reload()
+            self.member_ids = index['member_ids']
+            self.offsets = index['offsets']
+
+        self.slots = {member_id: slot for slot, member_id in enumerate(self.member_ids)}
+
+        """A record written without its index entry (a crash between the two writes) is dropped"""
+        with open(self.path, 'ab') as archive_file:
+            archive_file.truncate(len(self.offsets) * self.RECORD.size)
+
+    @classmethod
+    def shared(cls, congress, chamber, directory=ARCHIVE_DIRECTORY):
+        """
+        :return: the process-wide archive for *congress* and *chamber*
+        :rtype: VoteArchive
+        """
+
+        key = (directory, str(congress), chamber)
+        if key not in cls._shared:
+            cls._shared[key] = cls(congress, chamber, directory)
+        return cls._shared[key]
+
+    @staticmethod
+    def vote_key(vote):
+        """
+        Roll call numbers restart every session, so records are keyed by session and number, i.e. '1-76'
+        """
+
+        return '{}-{}'.format(vote.session, vote.id)
+
+    def __len__(self):
+        return len(self.offsets)
+
+    def __contains__(self, vote):
+        return self.vote_key(vote) in self.offsets
+
+    def append(self, vote):
+        """
+        Archives *vote* unless it is already archived. A vote whose new members would not fit in the free member slots
+        is not archived; that only warns, since appends happen inside WRITE_BEHIND's flush.
+        :param Vote vote: a vote of this archive's congress and chamber
+        :return: True if a record was written
+        """
+
+        with self.lock():
+            self._reload()
+            return self._append(vote)
+
+    def _append(self, vote):
+        key = self.vote_key(vote)
+        if key in self.offsets:
+            return False
+
+        newcomers = set(member['member_id'] for member in vote.positions) - set(self.slots)
+        if len(self.member_ids) + len(newcomers) > self.MEMBER_SLOTS:
+            warn("{} has no free member slots for the {} new members of roll call {}; it is not archived"
+                 .format(self.path, len(newcomers), key))
+            return False
+
+        """Pack the positions, giving members we have not seen before the next free slots"""
+        positions = bytearray(self.MEMBER_SLOTS)
+        counts = dict.fromkeys(self.POSITIONS, 0)
+        for member in vote.positions:
+            slot = self.slots.get(member['member_id'])
+            if slot is None:
+                slot = self.slots[member['member_id']] = len(self.member_ids)
+                self.member_ids.append(member['member_id'])
+            position = member['vote_position'] if member['vote_position'] in self.POSITION_CODES else 'Other'
+            positions[slot] = self.POSITION_CODES[position]
+            counts[position] += 1
+
+        when = vote.datetime
+        if isinstance(when, basestring):
+            when = datetime.datetime.strptime(when, "%Y-%m-%dT%H:%M:%S")
+        result = vote.result.lower()
+        bill = vote.title if vote.bill_name != "Non-Bill Measure" else ''
+
+        record = self.RECORD.pack(key, bill.encode('utf-8')[:16], int(vote.session),
+                                  int('pass' in result or 'agreed' in result or 'confirmed' in result),
+                                  int(vote.id), calendar.timegm(when.timetuple()),  # Eastern wall-clock seconds
+                                  counts['Yes'], counts['No'], counts['Not Voting'], counts['Present'],
+                                  len(vote.positions), str(positions))
+
+        """Record first, then the index that makes it visible"""
+        with open(self.path, 'ab') as archive_file:
+            archive_file.write(record)
+            archive_file.flush()
+            os.fsync(archive_file.fileno())
+        self.offsets[key] = len(self.offsets)
+
+        atomic_write(self.index_path, json.dumps({'version': self.VERSION, 'congress': self.congress,
+                                                  'chamber': self.chamber, 'record_size': self.RECORD.size,
+                                                  'member_ids': self.member_ids, 'offsets': self.offsets}))
+
+        return True
+
+    def get(self, key):
+        """
+        Reads one record through the offset index, without NumPy
+        :param str key: a vote key, i.e. '1-76'
+        :return: the record's fields as a dict, with 'positions' as {member_id: position}
+        :rtype: dict
+        """
+
+        with open(self.path, 'rb') as archive_file:
+            archive_file.seek(self.offsets[key] * self.RECORD.size)
+            fields = self.RECORD.unpack(archive_file.read(self.RECORD.size))
+
+        record = dict(zip([name for name, _ in self.DTYPE[:-1]], fields[:-1]))
+        record['vote_key'] = record['vote_key'].rstrip('\0')
+        record['bill'] = record['bill'].rstrip('\0')
+        record['positions'] = {self.member_ids[slot]: self.POSITIONS[code]
+                               for slot, code in enumerate(bytearray(fields[-1])) if code}
+        return record
+
+    def records(self):
+        """
+        Maps the archive into memory as a NumPy structured array. Nothing is copied: fields like
+        records()['positions'] (a roll calls x member slots array of position codes) are views onto the file.
+        :rtype: numpy.ndarray
+        """
+
+        import numpy
+
+        dtype = numpy.dtype(self.DTYPE)
+        if not self.offsets:
+            return numpy.zeros(0, dtype=dtype)
+
+        with open(self.path, 'rb') as archive_file:
+            mapped = mmap.mmap(archive_file.fileno(), 0, access=mmap.ACCESS_READ)  # Stays valid after close
+        return numpy.frombuffer(mapped, dtype=dtype, count=len(self.offsets))
+
+
+class RenderCache:
+    """
+    Rendered roll call posts (title, text, comment chunks and flair), one JSON file per vote under
+    RENDER_CACHE_DIRECTORY. Each entry is stamped with the version it was rendered under: a hash of the rendering code
+    and its settings plus the roster version, so editing the template or updating a roster invalidates it on its own.
+    """
+
+    _shared = {}  # directory: RenderCache
+    _lock = threading.Lock()  # Guards _shared; DailyVotes renders each chamber from a thread of its own
+    _template_version = None
+
+    def __init__(self, directory=RENDER_CACHE_DIRECTORY):
+        """
+        :param str directory: where the rendered votes are kept
+        """
+
+        self.directory = directory
+        try:
+            os.makedirs(self.directory)
+        except OSError:  # Already there, or just made by another process
+            if not os.path.isdir(self.directory):
+                raise
+
+    @classmethod
+    def shared(cls, directory=RENDER_CACHE_DIRECTORY):
+        """
+        :return: the process-wide cache for *directory*
+        :rtype: RenderCache
+        """
+
+        with cls._lock:
+            if directory not in cls._shared:
+                cls._shared[directory] = cls(directory)
+            return cls._shared[directory]
+
+    @classmethod
+    def template_version(cls):
+        """
+        :return: a hash of the code and settings that rendering depends on, computed once per process
+        :rtype: str
+        """
+
+        if cls._template_version is None:
+            template = hashlib.sha1()
+            for source in (Vote._render, pack_comments, Roster.label):
+                template.update(inspect.getsource(source))
+            template.update(repr((COMMENT_LIMIT, VOTE_PASS_FLAIR_ID, VOTE_FAIL_FLAIR_ID)))
+            cls._template_version = template.hexdigest()
+        return cls._template_version
+
+    def version(self, roster):
+        """
+        :param Roster roster: the roster the vote's members are labeled from
+        :return: the version stamp renders made now get
+        :rtype: str
+        """
+
+        return '{}-{}'.format(self.template_version(), roster.version)
+
+    def path(self, vote):
+        return os.path.join(self.directory, vote.unique_id() + '.json')
+
+    def get(self, vote, version):
+        """
+        :return: *vote*'s cached render, or None if it was never rendered or was rendered under another version
+        :rtype: dict
+        """
+
+        try:
+            with open(self.path(vote), 'r') as cache_file:
+                entry = json.load(cache_file)
+        except (IOError, ValueError):
+            return None
+
+        return entry['rendered'] if entry.get('version') == version else None
+
+    def put(self, vote, version, rendered):
+        """
+        Caches *vote*'s render under *version*, replacing whatever was cached for it before
+        """
+
+        atomic_write(self.path(vote), json.dumps({'version': version, 'rendered': rendered}))
+
+
+class BillRepository:
+    """
+    The saved bills in BILL_DIRECTORY, found through a manifest (manifest.json in the same directory) of each bill's
+    id, tracking flag, status, last action, file and the file's mtime. Queries are answered from the manifest, so only
+    the bills a query asks for are ever read, and those are read by a pool of workers.
+    The manifest also keeps the directory's mtime: while that is unchanged no file was added, replaced or removed, and
+    opening the repository costs one stat no matter how many bills are archived. WRITE_BEHIND records the bills it
+    writes as it writes them.
+    """
+
+    MANIFEST = 'manifest.json'
+    WORKERS = 8
+
+    _shared = {}  # directory: BillRepository
+
+    def __init__(self, directory=BILL_DIRECTORY):
+        """
+        :param str directory: where the bill files are
+        """
+
+        self.directory = directory
+        self.manifest_path = os.path.join(directory, self.MANIFEST)
+        self.directory_mtime = None  # As of the last time every file was checked against the manifest
+        self.entries = {}  # bill_id: {'tracking', 'status', 'last_action', 'path', 'mtime'}
+        self.bills = {}  # bill_id: Bill, for the bills loaded so far
+
+        try:
+            with open(self.manifest_path, 'r') as manifest_file:
+                manifest = json.load(manifest_file)
+            self.directory_mtime = manifest['directory_mtime']
+            self.entries = manifest['bills']
+        except (IOError, ValueError):  # Missing or half-written: rebuilt from the bill files below
+            pass
+
+        if os.path.getmtime(self.directory) != self.directory_mtime:
+            self.refresh()
+
+    @classmethod
+    def shared(cls, directory=BILL_DIRECTORY):
+        """
+        :return: the process-wide repository for *directory*
+        :rtype: BillRepository
+        """
+
+        if directory not in cls._shared:
+            cls._shared[directory] = cls(directory)
+        return cls._shared[directory]
+
+    def _map(self, function, items):
+        from multiprocessing.dummy import Pool
+
+        if len(items) < 2:
+            return map(function, items)
+        pool = Pool(min(self.WORKERS, len(items)))
+        try:
+            return pool.map(function, items)
+        finally:
+            pool.close()
+
+    def _summarize(self, name):
+        """
+        :return: the manifest entry for a bill file, read from the file itself
+        :rtype: dict
+        """
+
+        path = os.path.join(self.directory, name)
+        mtime = os.path.getmtime(path)
+        fields = json.loads(read_document(path))
+        return fields['bill_id'], {'tracking': fields.get('tracking'), 'status': fields.get('status'),
+                                   'last_action': fields.get('last_action'), 'path': name, 'mtime': mtime}
+
+    def refresh(self):
+        """
+        Brings the manifest up to date with the directory, reading only the files added or replaced since it was saved
+        :return: the number of files read
+        :rtype: int
+        """
+
+        if not os.path.exists(self.manifest_path):
+            open(self.manifest_path, 'w').close()  # Creating it changes the directory mtime, so it comes first
+        directory_mtime = os.path.getmtime(self.directory)
+        names = set(name for name in os.listdir(self.directory) if name.endswith('.json') and name != self.MANIFEST)
+
+        for bill_id, entry in self.entries.items():
+            if entry['path'] not in names:
+                del self.entries[bill_id]
+        current = {entry['path']: entry['mtime'] for entry in self.entries.itervalues()}
+        changed = [name for name in sorted(names)
+                   if current.get(name) != os.path.getmtime(os.path.join(self.directory, name))]
+
+        with TRACER.span('BillRepository.refresh', files=len(changed)):
+            for bill_id, entry in self._map(self._summarize, changed):
+                self.entries[bill_id] = entry
+                self.bills.pop(bill_id, None)
+
+        self.directory_mtime = directory_mtime
+        self.save()
+        return len(changed)
+
+    def save(self):
+        # Rewritten in place rather than renamed over, which would change the directory mtime it records. A manifest
+        # left half-written by a crash fails to parse and is rebuilt.
+        with open(self.manifest_path, 'w') as manifest_file:
+            json.dump({'directory_mtime': self.directory_mtime, 'bills': self.entries}, manifest_file)
+
+    def record(self, bill):
+        """
+        Updates *bill*'s manifest entry after its file was written. The directory mtime is left alone, so the next
+        process to open the repository still checks every file once.
+        :param Bill bill: a bill whose json_file was just written
+        """
+
+        last_action = bill.last_action
+        if isinstance(last_action, datetime.datetime):
+            last_action = last_action.isoformat()
+        self.entries[bill.bill_id] = {'tracking': bill.tracking, 'status': bill.status, 'last_action': last_action,
+                                      'path': os.path.basename(bill.json_file),
+                                      'mtime': os.path.getmtime(bill.json_file)}
+        self.bills[bill.bill_id] = bill
+
+    def query(self, tracking=None, status=None, since=None):
+        """
+        Finds bills from the manifest alone
+        :param bool tracking: only bills with this tracking flag
+        :param str status: only bills with this status, i.e. 'passed_house'
+        :param datetime.datetime since: only bills whose last action was on or after this
+        :return: the matching bill ids
+        :rtype: list
+        """
+
+        since = since.isoformat() if since else None
+        return sorted(bill_id for bill_id, entry in self.entries.iteritems()
+                      if (tracking is None or bool(entry['tracking']) == tracking)
+                      and (status is None or entry['status'] == status)
+                      and (since is None or (entry['last_action'] or '') >= since))
+
+    def load(self, bill_ids=None, **query):
+        """
+        Loads bills in parallel, skipping those already loaded
+        :param bill_ids: the bills to load; if not given, those matching *query* (see query())
+        :return: the bills, in the order of *bill_ids*
+        :rtype: list of Bill
+        """
+
+        if bill_ids is None:
+            bill_ids = self.query(**query)
+
+        missing = [bill_id for bill_id in bill_ids if bill_id not in self.bills]
+        paths = [os.path.join(self.directory, self.entries[bill_id]['path']) for bill_id in missing]
+        with TRACER.span('BillRepository.load', bills=len(missing)):
+            for bill_id, bill in zip(missing, self._map(lambda path: Bill(file_path=path), paths)):
+                self.bills[bill_id] = bill
+
+        return [self.bills[bill_id] for bill_id in bill_ids]
+
+    def get(self, bill_id):
+        """
+        :return: the bill, loading it if needed, or None if no bill with that id is saved
+        :rtype: Bill
+        """
+
+        if bill_id not in self.bills:
+            if bill_id not in self.entries:
+                return None
+            self.load([bill_id])
+        return self.bills[bill_id]
+
+
+class SubjectCache:
+    """
+    Bill subjects, fetched from ProPublica once per bill and then kept on disk for good, along with a reverse
+    subject -> bills index for grouping bills by topic. Only real answers are cached: a failed or empty lookup is
+    retried on the next refresh instead of being stored as the bill's subjects.
+    """
+
+    _shared = {}  # path: SubjectCache
+
+    def __init__(self, path=SUBJECT_CACHE_FILE):
+        """
+        :param str path: the JSON file that holds {bill_id: [subject, ...]}
+        """
+
+        self.path = path
+        self.subjects = {}  # bill_id: list of subjects
+        self.bills_by_subject = {}  # subject: set of bill_ids
+
+        if os.path.exists(self.path):
+            with open(self.path, 'r') as cache_file:
+                self.subjects = json.load(cache_file)
+        for bill_id, subjects in self.subjects.iteritems():
+            for subject in subjects:
+                self.bills_by_subject.setdefault(subject, set()).add(bill_id)
+
+    @classmethod
+    def shared(cls, path=SUBJECT_CACHE_FILE):
+        """
+        :return: the process-wide cache for *path*
+        :rtype: SubjectCache
+        """
+
+        if path not in cls._shared:
+            cls._shared[path] = cls(path)
+        return cls._shared[path]
+
+    def get(self, bill_id):
+        """
+        :return: the cached subjects of *bill_id*, or None on a miss
+        """
+
+        return self.subjects.get(bill_id)
+
+    def put(self, bill_id, subjects):
+        """
+        Caches *bill_id*'s subjects and updates the reverse index
+        """
+
+        for subject in self.subjects.get(bill_id, []):
+            self.bills_by_subject[subject].discard(bill_id)
+        self.subjects[bill_id] = subjects
+        for subject in subjects:
+            self.bills_by_subject.setdefault(subject, set()).add(bill_id)
+
+        atomic_write(self.path, json.dumps(self.subjects))
+
+    def lookup(self, bill, key):
+        """
+        Returns *bill*'s subjects from the cache, asking ProPublica only on a miss
+        :param Bill bill: a bill with bill_id and session set
+        :param key: the ProPublica API key
+        :return: list of subjects, or None if they are not known yet
+        """
+
+        subjects = self.get(bill.bill_id)
+        if subjects is None:
+            subjects = bill.get_subjects(key)
+            if subjects:
+                self.put(bill.bill_id, subjects)
+
+        return subjects or None
+
+    def bills(self, subject):
+        """
+        :return: the ids of every cached bill filed under *subject*
+        :rtype: list of str
+        """
+
+        return sorted(self.bills_by_subject.get(subject, ()))
+
+
+class SearchIndex:
+    """
+    A ranked full-text index over every saved Bill and Vote, kept in SQLite as an inverted index of
+    term -> (document, word positions). WRITE_BEHIND updates it as bills and votes are written, so queries never load a
+    bill or vote file.
+    Queries are keywords, which must all appear, and "quoted phrases", which must appear word for word; results are
+    ranked by BM25.
+    """
+
+    BILL_FIELDS = ['title', 'name', 'sparknotes', 'subjects', 'sponsor']
+    VOTE_FIELDS = ['question', 'description', 'bill_name']
+    FIELD_GAP = 100  # Added between fields' word positions so a phrase never matches across two fields
+
+    _shared = {}  # path: SearchIndex
+
+    def __init__(self, path=SEARCH_INDEX_FILE):
+        """
+        :param str path: the SQLite file that holds the index
+        """
+
+        self.path = path
+
+        connection = self._connect()
+        connection.executescript('''
+            CREATE TABLE IF NOT EXISTS documents (
+                doc_id TEXT PRIMARY KEY, kind TEXT NOT NULL, title TEXT, path TEXT, fullname TEXT,
+                length INTEGER NOT NULL);
+            CREATE TABLE IF NOT EXISTS postings (
+                term TEXT NOT NULL, doc_id TEXT NOT NULL, positions TEXT NOT NULL, PRIMARY KEY (term, doc_id));
+            CREATE INDEX IF NOT EXISTS postings_doc ON postings (doc_id);
+        ''')
+        connection.close()
+
+    @classmethod
+    def shared(cls, path=SEARCH_INDEX_FILE):
+        """
+        :return: the process-wide index for *path*
+        :rtype: SearchIndex
+        """
+
+        if path not in cls._shared:
+            cls._shared[path] = cls(path)
+        return cls._shared[path]
+
+    def _connect(self):
+        return sqlite3.connect(self.path, timeout=60)
+
+    @staticmethod
+    def tokenize(text):
+        """
+        :return: the lowercase words of *text*
+        :rtype: list of unicode
+        """
+
+        return re.findall(r'[a-z0-9]+', text.lower())
+
+    def add(self, document):
+        """
+        Indexes (or re-indexes) a Bill or Vote, replacing whatever was indexed for it before
+        :param document: a Bill or Vote
+        """
+
+        self.add_many([document])
+
+    def add_many(self, documents):
+        """
+        Indexes (or re-indexes) Bills and Votes in one transaction, so a reader never sees a half-indexed document
+        :param documents: list of Bill and Vote
+        """
+
+        connection = self._connect()
+        with connection:
+            for document in documents:
+                if isinstance(document, Bill):
+                    kind, doc_id, fields, title = 'bill', document.bill_id, self.BILL_FIELDS, document.title
+                else:
+                    kind, doc_id, fields, title = 'vote', document.unique_id(), self.VOTE_FIELDS, document.question
+                    # Votes indexed before that were keyed 'house76'; such a row is replaced if it is for this same file
+                    legacy_id = document.chamber + document.id
+                    if connection.execute('SELECT 1 FROM documents WHERE doc_id = ? AND path = ?',
+                                          (legacy_id, document.json_file)).fetchone():
+                        connection.execute('DELETE FROM postings WHERE doc_id = ?', (legacy_id,))
+                        connection.execute('DELETE FROM documents WHERE doc_id = ?', (legacy_id,))
+
+                """Collect each term's word positions across the indexed fields"""
+                positions = {}
+                offset = 0
+                for field in fields:
+                    value = getattr(document, field, None) or u''
+                    if isinstance(value, list):
+                        value = u' '.join(value)
+                    words = self.tokenize(value)
+                    for i, word in enumerate(words):
+                        positions.setdefault(word, []).append(offset + i)
+                    offset += len(words) + self.FIELD_GAP
+
+                connection.execute('DELETE FROM postings WHERE doc_id = ?', (doc_id,))
+                connection.execute('INSERT OR REPLACE INTO documents VALUES (?, ?, ?, ?, ?, ?)',
+                                   (doc_id, kind, title, document.json_file, getattr(document, 'fullname', None),
+                                    sum(len(p) for p in positions.values())))
+                connection.executemany('INSERT INTO postings VALUES (?, ?, ?)',
+                                       [(term, doc_id, json.dumps(p)) for term, p in positions.iteritems()])
+        connection.close()
+
+    def search(self, query, kind=None, posted=None, limit=20):
+        """
+        Finds the documents that contain every keyword and phrase of *query*, best match first.
+        :param str query: i.e. 'health "pre-existing conditions"'
+        :param str kind: 'bill' or 'vote' to search only one kind of document
+        :param bool posted: True for only documents that have a Reddit post, False for only those without
+        :param int limit: the most results to return
+        :return: dicts with 'doc_id', 'kind', 'title', 'path', 'fullname' and 'score'
+        :rtype: list of dict
+        """
+
+        phrases = [self.tokenize(phrase) for phrase in re.findall(r'"([^"]*)"', query)]
+        phrases = [phrase for phrase in phrases if len(phrase) > 1]
+        terms = set(self.tokenize(query))
+        if not terms:
+            return []
+
+        connection = self._connect()
+        try:
+            """Load the postings for every query term; only documents containing all of them are candidates"""
+            postings = {}
+            candidates = None
+            for term in terms:
+                rows = connection.execute('SELECT doc_id, positions FROM postings WHERE term = ?', (term,)).fetchall()
+                postings[term] = {doc_id: p for doc_id, p in rows}
+                candidates = set(postings[term]) if candidates is None else candidates & set(postings[term])
+                if not candidates:
+                    return []
+
+            (total, average_length) = connection.execute('SELECT COUNT(*), AVG(length) FROM documents').fetchone()
+
+            results = []
+            for doc_id in candidates:
+                (doc_kind, title, path, fullname, length) = connection.execute(
+                    'SELECT kind, title, path, fullname, length FROM documents WHERE doc_id = ?', (doc_id,)).fetchone()
+                if kind and doc_kind != kind:
+                    continue
+                if posted is not None and bool(fullname) != posted:
+                    continue
+
+                positions = {term: json.loads(postings[term][doc_id]) for term in terms}
+                if not all(self._has_phrase(positions, phrase) for phrase in phrases):
+                    continue
+
+                results.append({'doc_id': doc_id, 'kind': doc_kind, 'title': title, 'path': path,
+                                'fullname': fullname,
+                                'score': self._bm25(positions, postings, total, length, average_length)})
+        finally:
+            connection.close()
+
+        results.sort(key=lambda result: result['score'], reverse=True)
+        return results[:limit]
+
+    @staticmethod
+    def _has_phrase(positions, phrase):
+        """
+        :return: True if the words of *phrase* appear consecutively
+        """
+
+        following = [set(positions[word]) for word in phrase[1:]]
+        for start in positions[phrase[0]]:
+            if all(start + i + 1 in words for i, words in enumerate(following)):
+                return True
+        return False
+
+    @staticmethod
+    def _bm25(positions, postings, total, length, average_length, k1=1.2, b=0.75):
+        score = 0.0
+        for term, found in positions.iteritems():
+            frequency = len(found)
+            rarity = math.log(1 + (total - len(postings[term]) + 0.5) / (len(postings[term]) + 0.5))
+            score += rarity * frequency * (k1 + 1) / (frequency + k1 * (1 - b + b * length / (average_length or 1)))
+        return score
+
+
+class RateBudget:
+    """
+    The Reddit request budget, shared by every RedditClient and process on this host. Each request is recorded in a
+    SQLite file as a timestamp, and a request may only go out while fewer than *limit* were made in the last *window*
+    seconds. SQLite's write lock serializes the check-and-record, so concurrent jobs split the budget between them
+    instead of each assuming it owns all of it.
+    """
+
+    def __init__(self, path=RATE_BUDGET_FILE, limit=60, window=60):
+        """
+        :param str path: the SQLite file that holds the request log
+        :param int limit: requests allowed per window
+        :param int window: length of the window in seconds
+        """
+
+        self.path = path
+        self.limit = limit
+        self.window = window
+
+        connection = self._connect()
+        connection.execute('CREATE TABLE IF NOT EXISTS requests (made_at REAL NOT NULL)')
+        connection.close()
+
+    def _connect(self):
+        # A connection per call keeps the budget usable from any thread, and isolation_level=None lets us BEGIN
+        # IMMEDIATE ourselves so the count and the insert happen under one write lock
+        return sqlite3.connect(self.path, timeout=60, isolation_level=None)
+
+    def remaining(self):
+        """
+        :return: how many requests may be made right now without waiting
+        :rtype: int
+        """
+
+        connection = self._connect()
+        try:
+            (used,) = connection.execute('SELECT COUNT(*) FROM requests WHERE made_at > ?',
+                                         (time.time() - self.window,)).fetchone()
+        finally:
+            connection.close()
+
+        return self.limit - used
+
+    def acquire(self):
+        """
+        Records one request against the budget, first sleeping until the oldest request in the window ages out if
+        the budget is spent.
+        :return: the number of seconds spent waiting
+        :rtype: float
+        """
+
+        waited = 0.0
+        connection = self._connect()
+        try:
+            while True:
+                now = time.time()
+                connection.execute('BEGIN IMMEDIATE')
+                connection.execute('DELETE FROM requests WHERE made_at <= ?', (now - self.window,))
+                (used, oldest) = connection.execute('SELECT COUNT(*), MIN(made_at) FROM requests').fetchone()
+                if used < self.limit:
+                    connection.execute('INSERT INTO requests (made_at) VALUES (?)', (now,))
+                    connection.execute('COMMIT')
+                    return waited
+                connection.execute('COMMIT')
+
+                pause = max(oldest + self.window - now, 0.05)
+                print "[CLIENT]: Request budget spent, waiting {:.1f}s".format(pause)
+                with TRACER.span('throttle', seconds=pause):
+                    time.sleep(pause)
+                waited += pause
+        finally:
+            connection.close()
+
+
+class TokenCache:
+    """
+    Reddit OAuth tokens kept on disk with their real expiry, readable only by their owner. Every RedditClient on this
+    host reads it first, so cron runs and concurrent jobs reuse a live token instead of authorizing at startup.
+    """
+
+    def __init__(self, path=TOKEN_CACHE_FILE):
+        """
+        :param str path: the cache file. Created with 0600 permissions.
+        """
+
+        self.path = path
+
+    def _read(self):
+        if not os.path.exists(self.path):
+            return {}
+        with open(self.path, 'r') as cache_file:
+            try:
+                return json.load(cache_file)
+            except ValueError:  # A damaged cache only costs one authorization
+                return {}
+
+    def get(self, username):
+        """
+        :return: dict with 'access_token' and 'expires_at' (epoch seconds) for *username*, or None
+        """
+
+        return self._read().get(username)
+
+    def store(self, username, access_token, expires_at):
+        """
+        Saves *username*'s token, replacing the file atomically so readers never see a partial write
+        """
+
+        tokens = self._read()
+        tokens[username] = {'access_token': access_token, 'expires_at': expires_at}
+
+        atomic_write(self.path, json.dumps(tokens), permissions=0600)
+
+    @contextmanager
+    def lock(self):
+        """
+        Holds an exclusive lock on the cache across processes while a token is checked and renewed
+        """
+
+        import fcntl
+
+        fd = os.open(self.path + '.lock', os.O_RDWR | os.O_CREAT, 0600)
+        try:
+            fcntl.flock(fd, fcntl.LOCK_EX)
+            yield
+        finally:
+            fcntl.flock(fd, fcntl.LOCK_UN)
+            os.close(fd)
+
+
+def iter_stored_votes(vote_directory='./votes', bill_directory='./bills'):
+    """
+    Walks every stored vote, one at a time: the files in *vote_directory*, then any vote a stored bill refers to that
+    is kept somewhere else. Each vote is yielded once.
+    :rtype: generator of Vote
+    """
+
+    seen = set()
+
+    if os.path.isdir(vote_directory):
+        for file_name in sorted(os.listdir(vote_directory)):
+            if file_name.endswith('.json'):
+                path = os.path.normpath(os.path.join(vote_directory, file_name))
+                seen.add(path)
+                yield Vote(file_path=path)
+
+    if os.path.isdir(bill_directory):
+        for file_name in sorted(os.listdir(bill_directory)):
+            if not file_name.endswith('.json'):
+                continue
+            # Plain json: no need to rebuild the Bill
+            references = json.loads(read_document(os.path.join(bill_directory, file_name))).get('votes') or []
+            for reference in references:
+                path = os.path.normpath(reference[1:-1])  # Saved as "<./votes/house76.json>"
+                if path not in seen and os.path.exists(path):
+                    seen.add(path)
+                    yield Vote(file_path=path)
+
+
+def iter_position_rows(vote):
+    """
+    Flattens one vote into export rows
+    :rtype: generator of (congress, chamber, roll_call, datetime, member_id, party, state, position) tuples
+    """
+
+    congress = getattr(vote, 'congress', CURRENT_CONGRESS)
+    when = vote.datetime if isinstance(vote.datetime, basestring) else vote.datetime.isoformat()
+    for member in vote.positions:
+        yield (congress, vote.chamber, vote.id, when, member['member_id'], member.get('party') or u'',
+               member.get('state') or u'', member['vote_position'])
+
+
+class VoteExporter:
+    """
+    Streams stored votes into one flat table of member positions, as CSV (through UnicodeWriter) or as compressed
+    NPZ (one set of column arrays per chunk of rows). Memory use is bounded by a single vote for CSV and a single
+    chunk for NPZ. A state file beside the export records which roll calls it holds and how far it was written, so a
+    re-run only appends roll calls added since the last export, and an interrupted export resumes cleanly.
+    """
+
+    COLUMNS = ['congress', 'chamber', 'roll_call', 'datetime', 'member_id', 'party', 'state', 'position']
+    CHUNK_ROWS = 100000  # NPZ rows per chunk
+    CHECKPOINT_VOTES = 100  # CSV votes between state saves
+
+    def __init__(self, path):
+        """
+        :param str path: the export file; a name ending in .npz exports NPZ, anything else CSV
+        """
+
+        self.path = path
+        self.format = 'npz' if path.endswith('.npz') else 'csv'
+        self.state_path = path + '.state.json'
+
+        self.exported = set()  # Keys of the roll calls already in the export
+        self.size = 0  # Bytes of the CSV (or chunks of the NPZ) that the exported keys account for
+        if os.path.exists(self.state_path):
+            with open(self.state_path, 'r') as state_file:
+                state = json.load(state_file)
+            self.exported = set(state['exported'])
+            self.size = state['size']
+
+    @staticmethod
+    def key(vote):
+        return '{}-{}-{}-{}'.format(getattr(vote, 'congress', CURRENT_CONGRESS), vote.chamber, vote.session, vote.id)
+
+    def _save_state(self):
+        atomic_write(self.state_path,
+                     json.dumps({'format': self.format, 'exported': sorted(self.exported), 'size': self.size}))
+
+    def export(self, votes):
+        """
+        Appends every vote in *votes* that is not in the export yet
+        :param votes: an iterable of Vote, i.e. iter_stored_votes()
+        :return: the number of roll calls added
+        :rtype: int
+        """
+
+        fresh = (vote for vote in votes if self.key(vote) not in self.exported)
+        if self.format == 'csv':
+            return self._export_csv(fresh)
+        return self._export_npz(fresh)
+
+    def _export_csv(self, votes):
+        added = 0
+        with open(self.path, 'ab') as csv_file:
+            csv_file.truncate(self.size)  # Drop rows written after the last checkpoint of an interrupted run
+            writer = UnicodeWriter(csv_file)
+            if self.size == 0:
+                writer.writerow(self.COLUMNS)
+
+            for vote in votes:
+                writer.writerows([unicode(field) for field in row] for row in iter_position_rows(vote))
+                self.exported.add(self.key(vote))
+                added += 1
+
+                if added % self.CHECKPOINT_VOTES == 0:
+                    csv_file.flush()
+                    self.size = csv_file.tell()
+                    self._save_state()
+
+            csv_file.flush()
+            self.size = csv_file.tell()
+
+        self._save_state()
+        return added
+
+    def _export_npz(self, votes):
+        added = 0
+        rows, keys = [], []
+        for vote in votes:
+            rows.extend(iter_position_rows(vote))
+            keys.append(self.key(vote))
+            if len(rows) >= self.CHUNK_ROWS:  # Chunks end on a vote boundary, so a chunk is all-or-nothing
+                self._write_chunk(rows, keys)
+                added += len(keys)
+                rows, keys = [], []
+
+        if rows:
+            self._write_chunk(rows, keys)
+            added += len(keys)
+
+        return added
+
+    def _write_chunk(self, rows, keys):
         """
-        An object to represent a Member of Congress, to include both house reps and senators.
-        :param key: the ProPublica API key, which is not stored in the MOC class
-        :param member_id: the member ID, gained from either a local csv (recommended) or this GET call:
-            GET https://api.propublica.org/congress/v1/{congress}/{chamber}/members.json
+        Adds one chunk to the NPZ as a .npy array per column, then records its roll calls in the state file.
+        The chunk is added to a copy of the NPZ that is renamed into place, so an interrupted run never leaves a
+        half-written archive behind.
         """
 
-        self.id = member_id
+        import numpy
+        from io import BytesIO
 
-        """Attributes below are derivative of this API call"""
-        # Define authentication headers
-        headers = {"X-API-Key": key}
-        pp_json = requests.get("https://api.propublica.org/congress/v1/members/{}.json"
-                                  .format(self.id), headers=headers).json()['results]']
-
-        self.firstname = pp_json['first_name']
-        self.lastname = pp_json['last name']
-        self.middle_name = pp_json['middle_name']
-
-        self.party = pp_json['current_party']
-        self.birthday = pp_json['date_of_birth']
-        self.website = pp_json['url']
-        self.rss = pp_json['rss_url']
-        self.cspan_id = pp_json['cspan_id']
-        self.icpsr_id = pp_json['icpsr_id']
-        self.thomas_id = pp_json['thomas_id']
-
-        """Social Media"""
-        self.twitter = pp_json['twitter_account']
-        self.facebook = pp_json['facebook_account']
-        self.youtube = pp_json['youtube_account']
+        chunk = self.size  # For NPZ, size counts chunks
+        temp_path = self.path + '.tmp'
+        self._copy_recorded(temp_path)
+        with zipfile.ZipFile(temp_path, 'a', zipfile.ZIP_DEFLATED) as archive:
+            for i, column in enumerate(self.COLUMNS):
+                data = BytesIO()
+                numpy.lib.format.write_array(data, numpy.array([unicode(row[i]) for row in rows]))
+                archive.writestr('chunk{:05d}_{}.npy'.format(chunk, column), data.getvalue())
+        os.rename(temp_path, self.path)
 
-        """Congressional Positions"""
-        self.committees = {entry['congress']: entry['committees'] for entry in pp_json['roles']}
-        # TODO: Fill self.committees with find_committee function
-        self.roles = pp_json['roles']
-        self.total_votes = 0  # Set in get_votes
-        self.votes = self.get_votes(key)
+        self.size = chunk + 1
+        self.exported.update(keys)
+        self._save_state()
 
-    def get_votes(self, key):
+    def _copy_recorded(self, temp_path):
         """
-        Generates and returns a list of Vote objects
-        :param key:
-        :return: a list of vote-summary dictionaries in the format:
-                {
-                    "member_id": str,
-                    "chamber": house/senate,
-                    "congress": str of int,
-                    "session": str of int,
-                    "roll_call": str of int,
-                    "bill": {},
-                    "description": str
-                    "question": str,
-                    "datetime": datetime.datetime object
-                    "position": "Yes" or "No" or "Not Voting"
-                }
+        Copies the NPZ to *temp_path*, leaving out any chunk the state file does not list: a run interrupted between
+        renaming a chunk into place and recording it leaves one behind, which the re-run writes again
         """
-        headers = {"X-API-Key": key}
 
-        pp_json = requests.get("https://api.propublica.org/congress/v1/members/{}/votes.json"
-                               .format(self.id), headers=headers).json()['results']
+        if not os.path.exists(self.path):
+            if os.path.exists(temp_path):
+                os.remove(temp_path)
+            return
 
-        self.total_votes = pp_json['total_votes']
-        votes = pp_json['votes']
+        with zipfile.ZipFile(self.path, 'r') as archive:
+            members = archive.infolist()
+            recorded = [info for info in members if int(info.filename[len('chunk'):len('chunk00000')]) < self.size]
+            if len(recorded) == len(members):
+                shutil.copyfile(self.path, temp_path)
+                return
 
-        """Adjust the format to match Python datetime object"""
-        for vote in votes:
-            vote.update({'datetime': billtime(vote, raw=True)})
-            del vote['date']
-            del vote['time']
+            with zipfile.ZipFile(temp_path, 'w', zipfile.ZIP_DEFLATED) as copy:
+                for info in recorded:
+                    copy.writestr(info, archive.read(info))
 
-        return votes
 
+class VoteDigest:
+    """
+    Running tallies of every roll call, per member and per state, kept in SQLite at DIGEST_FILE. Each vote is folded in
+    once, in a single pass over its positions, as it is saved: its members' position counts for the week and its
+    state delegations' position counts are incremented in place, so nothing already counted is rewritten. A state's
+    weekly "how your delegation voted" post is built from these aggregates rather than by re-reading the week's vote
+    files for every state.
+    """
+
+    POSITIONS = ['Yes', 'No', 'Not Voting', 'Present']  # Order of a member's tally in the posts
 
-class Vote:
-    def __init__(self, url=None, key=None, file_path=None):
+    _shared = {}  # path: VoteDigest
+
+    def __init__(self, path=DIGEST_FILE):
         """
-        Generates a Vote object
-        :param congress: The string representing the current congress - i.e.'115' for the current one (2017)
-        :param chamber: The stirng 'house' or 'senate'
-        :param rc_id: A ProPublica roll-call ID
-        :param file_path: a filepath to a JSON-serialized Vote object
-        :param key:
+        :param str path: the SQLite file the digest is kept in
         """
 
-        """Deserialize a JSON if file_path exists"""
-        if file_path:
-            with open(file_path, 'r') as json_file:
-                self.__dict__ = json.load(json_file)
-                return
+        self.path = path
+
+        connection = self._connect()
+        connection.executescript('''
+            CREATE TABLE IF NOT EXISTS votes (
+                vote_key TEXT PRIMARY KEY, week TEXT NOT NULL, chamber TEXT, title TEXT, question TEXT, result TEXT,
+                datetime TEXT, fullname TEXT);
+            CREATE TABLE IF NOT EXISTS members (
+                member_id TEXT PRIMARY KEY, name TEXT, party TEXT, state TEXT, chamber TEXT);
+            CREATE TABLE IF NOT EXISTS member_tallies (
+                member_id TEXT NOT NULL, week TEXT NOT NULL, position TEXT NOT NULL, count INTEGER NOT NULL,
+                PRIMARY KEY (member_id, week, position));
+            CREATE TABLE IF NOT EXISTS state_tallies (
+                week TEXT NOT NULL, state TEXT NOT NULL, vote_key TEXT NOT NULL, position TEXT NOT NULL,
+                count INTEGER NOT NULL, PRIMARY KEY (week, state, vote_key, position));
+        ''')
+        connection.close()
 
-        self.session = 2 if datetime.datetime.now().year % 2 == 0 else 1
-        self.id = url[url.rindex('/') + 1: url.rindex('.')]
+    @classmethod
+    def shared(cls, path=DIGEST_FILE):
+        """
+        :return: the process-wide digest kept in *path*
+        :rtype: VoteDigest
+        """
 
-        # Define authentication headers
-        headers = {"X-API-Key": key}
+        if path not in cls._shared:
+            cls._shared[path] = cls(path)
+        return cls._shared[path]
 
-        pp_json = requests.get(url, headers=headers).json()['results']
-        vote_json = pp_json['votes']['vote']
+    def _connect(self):
+        return sqlite3.connect(self.path, timeout=60)
 
-        self.question = vote_json['question']
-        self.description = vote_json['description']
-        self.type = vote_json['vote_type']
-        self.datetime = billtime(vote_json, raw=True)
-        self.result = vote_json['result']
-        self.chamber = vote_json['chamber'][0].lower() + vote_json['chamber'][1:]
-        self.positions = vote_json['positions']
-        self.republican_summary = vote_json['republican']
-        self.democratic_summary = vote_json['democratic']
-        self.independent_summary = vote_json['independent']
-        self.fullname = None
+    @staticmethod
+    def week_of(when):
+        """
+        :return: the ISO week of *when*, i.e. '2017-W09'
+        :rtype: str
+        """
 
-        """JSON settings"""
-        self.json_file = './votes/' + self.chamber + self.id + '.json'
+        year, week, _ = when.isocalendar()
+        return '{}-W{:02d}'.format(year, week)
 
-        try:
-            self.title = vote_json['bill']['bill_id'].upper()
-            self.bill_name = vote_json['bill']['title']
-        except KeyError:
-            self.bill_name = "Non-Bill Measure"
-            self.title = self.question
+    @staticmethod
+    def monday_of(week):
+        """
+        :param str week: an ISO week, i.e. '2017-W09'
+        :return: the week's Monday
+        :rtype: datetime.date
+        """
 
-    @classmethod
-    def from_params(cls, congress, chamber, rc_id, key):
-        session = 2 if datetime.datetime.now().year % 2 == 0 else 1
-        new_vote = cls("https://api.propublica.org/congress/v1/{}/{}/sessions/{}/votes/{}.json" \
-            .format(congress, chamber, session, rc_id))
-        return new_vote
+        year, number = week.split('-W')
+        january_4 = datetime.date(int(year), 1, 4)  # Always in week 1
+        return january_4 - datetime.timedelta(days=january_4.weekday()) + datetime.timedelta(weeks=int(number) - 1)
 
-    def __getitem__(self, key):
-        return self.__dict__[key]
+    def fold(self, vote):
+        """
+        Counts a vote's positions into the member and state tallies. Folding a vote again only refreshes its summary,
+        i.e. to pick up the post it was given since.
+        :param Vote vote: a saved or freshly fetched vote
+        :return: True if the vote had not been counted before
+        """
 
-    def save(self):
+        return self.fold_many([vote]) == 1
+
+    def fold_many(self, votes):
         """
-        Serialize the object as a json object
-        :return: None
+        fold()s every vote in *votes* in one transaction
+        :param votes: an iterable of Vote, i.e. iter_stored_votes()
+        :return: the number of votes that had not been counted before
+        :rtype: int
         """
 
-        if type(self.datetime) not in (str, unicode):
-            self.datetime = self.datetime.isoformat()  # To allow serialization of datetime objects
+        added = 0
+        connection = self._connect()
+        with connection:
+            for vote in votes:
+                added += self._fold(connection, vote)
+        connection.close()
 
-        with open(self.json_file, 'w') as data_file:
-            json.dump(self.__dict__, data_file)
+        return added
 
-    def json_dump(self):
+    @staticmethod
+    def _increment(connection, table, key_columns, key, count):
+        where = ' AND '.join('{} = ?'.format(column) for column in key_columns)
+        connection.execute('INSERT OR IGNORE INTO {} ({}, count) VALUES ({}, 0)'
+                           .format(table, ', '.join(key_columns), ', '.join('?' * len(key_columns))), key)
+        connection.execute('UPDATE {} SET count = count + ? WHERE {}'.format(table, where), (count,) + key)
+
+    def _fold(self, connection, vote):
+        key = vote.unique_id()
+        when = vote.datetime
+        if isinstance(when, basestring):
+            when = datetime.datetime.strptime(when, "%Y-%m-%dT%H:%M:%S")
+        week = self.week_of(when)
+
+        summary = (vote.chamber, vote.title, vote.question, vote.result, when.isoformat(), vote.fullname)
+        if connection.execute('SELECT 1 FROM votes WHERE vote_key = ?', (key,)).fetchone():
+            connection.execute('UPDATE votes SET chamber = ?, title = ?, question = ?, result = ?, datetime = ?, '
+                               'fullname = ? WHERE vote_key = ?', summary + (key,))
+            return False
+        connection.execute('INSERT INTO votes VALUES (?, ?, ?, ?, ?, ?, ?, ?)', (key, week) + summary)
+
+        """One pass over the positions, counting into this vote's state delegations as we go"""
+        delegations = {}  # (state, position): count
+        for position in vote.positions:
+            connection.execute('INSERT OR IGNORE INTO members VALUES (?, ?, ?, ?, ?)',
+                               (position['member_id'], position.get('name'), position.get('party'),
+                                position.get('state'), vote.chamber))
+            self._increment(connection, 'member_tallies', ('member_id', 'week', 'position'),
+                            (position['member_id'], week, position['vote_position']), 1)
+            if position.get('state'):
+                pair = (position['state'], position['vote_position'])
+                delegations[pair] = delegations.get(pair, 0) + 1
+
+        for (state, position), count in delegations.iteritems():
+            self._increment(connection, 'state_tallies', ('week', 'state', 'vote_key', 'position'),
+                            (week, state, key, position), count)
+
+        return True
+
+    def member_tally(self, member_id):
         """
-        Serialize the object as a json object. Dump it instead of saving it to a file
-        :return: None
+        :return: the member's positions over every folded vote, {position: count}
+        :rtype: dict
         """
 
-        with open(self.json_file, 'w') as data_file:
-            json.dumps(self.__dict__, default=date_handler)
+        connection = self._connect()
+        try:
+            return dict(connection.execute('SELECT position, SUM(count) FROM member_tallies WHERE member_id = ? '
+                                           'GROUP BY position', (member_id,)).fetchall())
+        finally:
+            connection.close()
 
-    def load(self):
+    def states(self, week):
         """
-        Deserializes the object's json file at json_file and updates the object's __dict__ directly
-        :return:
+        :return: the states whose members voted in *week*
+        :rtype: list
         """
-        with open(self.json_file, 'r') as data_file:
-            self.__dict__ = json.load(data_file, object_pairs_hook=load_with_datetime)
 
-    # TODO: Move the reddit functions we do here (comment, flair, and hide) to the client object.
-    def unicode_post(self, client):
+        connection = self._connect()
+        try:
+            return [state for (state,) in connection.execute(
+                'SELECT DISTINCT state FROM state_tallies WHERE week = ? ORDER BY state', (week,))]
+        finally:
+            connection.close()
+
+    def state_post(self, state, week):
         """
-        post...but in unicode! yay.
-        :param client:
-        :return: the fullname of the link, or False if an error prevented completion.
-                Note that an error will not raise; this function only warns() as of now.
+        Builds a state's weekly post: each of the week's roll calls with how the state's delegation split on it, then
+        each member's tally for the week
+        :param str state: the two-letter state code
+        :param str week: the ISO week, i.e. '2017-W09'
+        :return: dict with the post 'title' and 'text', or None if the state's members cast no votes that week
+        :rtype: dict
         """
 
-        text = u""""""
+        connection = self._connect()
+        try:
+            cast = connection.execute(
+                'SELECT v.vote_key, v.chamber, v.title, v.question, v.result, v.fullname, s.position, s.count '
+                'FROM state_tallies s JOIN votes v ON v.vote_key = s.vote_key WHERE s.week = ? AND s.state = ? '
+                'ORDER BY v.datetime', (week, state)).fetchall()
+            weekly = connection.execute(
+                'SELECT m.name, m.party, t.position, t.count FROM member_tallies t '
+                'JOIN members m ON m.member_id = t.member_id WHERE t.week = ? AND m.state = ?',
+                (week, state)).fetchall()
+        finally:
+            connection.close()
+        if not cast:
+            return None
 
-        text += u'#Subject: "{}"\n'.format(self.description)
-        text += u'**Time: {}**\n\n'.format(self.datetime)
-        text += u'**Result: {}**\n\n'.format(self.result)
-        text += u'###Vote Summary:\n\n'
+        title = u"How {}'s delegation voted: week of {}".format(state, self.monday_of(week).strftime('%B %d, %Y'))
+
+        text = u'#{}\n\n'.format(title)
+        splits = {}  # vote_key: {position: count}
+        for vote_key, _, _, _, _, _, position, count in cast:
+            splits.setdefault(vote_key, {})[position] = count
+        for chamber in ['senate', 'house']:
+            summaries = []  # The chamber's roll calls, in time order, once each
+            for row in cast:
+                if row[1] == chamber and row[0] not in [summary[0] for summary in summaries]:
+                    summaries.append(row)
+            if not summaries:
+                continue
+            text += u'##{}\n\n'.format(chamber.title())
+
+            for vote_key, _, vote_title, question, result, fullname, _, _ in summaries:
+                heading = u'{}: {}'.format(vote_title, question) if vote_title != question else question
+                if fullname:
+                    heading = u'[{}](https://reddit.com/r/535/comments/{})'.format(heading, fullname[3:])
+                split = splits[vote_key]
+                text += u'**{}** - {} ({})\n\n'.format(heading, result, u', '.join(
+                    u'{} {}'.format(position, split[position])
+                    for position in sorted(split, key=lambda p: split[p], reverse=True)))
+
+        tallies = {}  # member label: {position: count} for this week
+        for name, party, position, count in weekly:
+            tallies.setdefault(u'{} ({})'.format(name, party), {})[position] = count
+
+        text += u'##Tally for the week\n\nMember|{}\n:---|{}\n'.format(u'|'.join(self.POSITIONS),
+                                                                     u'|'.join([u':---:'] * len(self.POSITIONS)))
+        for label in sorted(tallies):
+            text += u'{}|{}\n'.format(label, u'|'.join(unicode(tallies[label].get(p, 0)) for p in self.POSITIONS))
+
+        return {'title': title, 'text': text}
+
+
+class WorkingSet:
+    """
+    The hot state a run builds - the rosters, the member index, the bill repository with its tracked bills, recently
+    posted votes and the watch watermarks - pickled into SNAPSHOT_FILE at the end of a run and restored with one read
+    at the start of the next, instead of re-parsing the CSVs and JSON files.
+    Each restored piece is still checked the way a fresh one would be (a roster against its CSV, the repository
+    against its directory, a vote against its file), and a snapshot written by different code is ignored, leaving
+    everything to be rebuilt as usual.
+    """
 
-        """Add rollcall by party"""
-        for party in ['independent', 'democratic', 'republican']:
-            text += u"**{}:**\n\n".format(party.title())
-            for position, count in self['{}_summary'.format(party)].items():
-                if position in ['majority_position', 'present']:
-                    continue  # Not neccessary to convey this information
-                text += '*{}*: {}\n'.format(position.replace('_', ' ').title(), count)
-            text += '\n'
+    VERSION = 1  # Bump when what is pickled changes shape
+    RECENT = datetime.timedelta(days=7)  # How long a posted vote is kept in the snapshot
 
-        """Read internal CSV to determine who voted on what side"""
-        roll = {'Yes': [], 'No': [], 'Not Voting': []}
+    def __init__(self, path=SNAPSHOT_FILE):
+        """
+        :param str path: the snapshot file
+        """
 
-        with open('{}.csv'.format(self.chamber), 'r') as f:
-            r = UnicodeReader(f)
-
-            # TODO: Create a soft-copy of the chamber's csv to cut down on search time as members are found
-
-            for member in self.positions:
-                """Get to our desired entry. Error will kill loop if EOF reached"""
-                while True:
-                    line = r.next()
-                    if member['member_id'] in line:
-                        if self.chamber == 'senate':
-                            try:
-                                roll[member['vote_position']].append(u'{2}, {0} ({5}-{3})'.format(*line))
-                            except KeyError:
-                                roll[member['vote_position']] = u'{2}, {0} ({5}-{3})'.format(*line)
-                        else:  # Shortened string for house
-                            try:
-                                roll[member['vote_position']].append(u'{2} ({5}-{3}/{4})'.format(*line))
-                            except KeyError:
-                                roll[member['vote_position']] = [u'{2} ({5}-{3}/{4})'.format(*line)]
-                        break
-                f.seek(0)
+        self.path = path
+        self.votes = {}  # Normalized json_file: (file mtime, Vote)
+        self.watermarks = {}  # chamber: isoformat time of the latest roll call WatchVotes handled
 
-        """Add our roll to the bottom of the file"""
+    @classmethod
+    def stamp(cls):
+        """
+        :return: the version of the code that pickles and unpickles the working set
+        :rtype: str
+        """
 
-        if self.chamber == 'house':  # Request sizes made with the entire house are typically too large, so we'll put that in a comment.
-            comment = {}
-            for position, members in sorted(roll.items(), key=lambda x: x[1]):  # Sorts by popularity of position
-                comment[position] = u'**{}({}):**\n\n'.format(position, len(members))
-                for member in members:
-                    comment[position] += u'{}; \n'.format(member)
-                comment[position] += u'\n\n'
-        else:
-            comment = False
-            text += u"###Votes by Member\n\n"
-            for position, members in sorted(roll.items(), key=lambda x: x[1]):  # Sorts by popularity of position
-                text += u'**{}({}):**\n\n'.format(position, len(members))
-                for member in members:
-                    text += u'{}; \n'.format(member)
-                text += u'\n\n'
+        with open(os.path.splitext(__file__)[0] + '.py', 'rb') as source:
+            return '{}-{}'.format(cls.VERSION, hashlib.sha1(source.read()).hexdigest())
 
-        url = "https://oauth.reddit.com/api/submit"
+    def remember(self, vote):
+        """
+        Keeps a just-written vote for the snapshot and drops the ones older than RECENT
+        :param Vote vote: a vote whose json_file is up to date
+        """
 
-        # Reddit's max title length is 300
-        if len(self.bill_name) > 200:
-            billname = self.bill_name[197:] + '...'
-        else:
-            billname = self.bill_name
-        if self.question > 50:
-            question = self.question[47:] + '...'
-        else:
-            question = self.question
+        cutoff = datetime.datetime.now() - self.RECENT
+        for path in [path for path, (mtime, kept) in self.votes.iteritems() if not self.recent(kept, cutoff)]:
+            del self.votes[path]
 
-        params = {
-            "kind": "self",
-            "text": text,
-            "sendreplies": "true",
-            # Capitalize the chamber in the title
-            "title": '{} Vote: {}; {}'.format(
-                self.chamber[:1].upper() + self.chamber[1:], billname, question
-            ),
-            "sr": "535"
-        }
-        post_r = client.request('POST', url, params=params)
+        if self.recent(vote, cutoff):
+            path = os.path.normpath(vote.json_file)
+            self.votes[path] = (os.path.getmtime(path), vote)
 
+    @staticmethod
+    def recent(vote, cutoff):
+        """
+        Tells whether a vote happened at or after a cutoff
+        :param Vote vote: the vote to check
+        :param datetime.datetime cutoff: the oldest time still kept
+        :return: True if the vote is recent enough to keep
+        """
 
-        """Calmly tell Chuck he's an idiot if he messed something up."""
-        if post_r.status_code != 200:
-            warn("Vote post request returned {}".format(post_r.status_code))
-            print post_r.text()
-            return None
-        fn_search = re.search('comments\/([a-zA-Z0-9_]*)\/', post_r.text)
-        if not fn_search:
-            print "No fullname regexed, retrying"
-            print self.question
-            print post_r.text
-            return None
-        else:
-            fullname = 't3_' + fn_search.group(1)  # For future comment+/flair
+        when = vote.datetime
+        if isinstance(when, basestring):
+            when = datetime.datetime.strptime(when, "%Y-%m-%dT%H:%M:%S")
+        return when >= cutoff
 
-        """If we are dealing with a House of Representatives post, we are going to post the positions as comments"""
-        if comment:
-            # General comment params:
-            c_params = {
-                'api_type': 'json',
-                'thing_id': fullname
-            }
-            for pos, data in comment.iteritems():
-                c_params.update(text=data)
-                comment_r = client.request('POST', 'https://oauth.reddit.com/api/comment', params=c_params)
-                if comment_r.status_code != 200:
-                    warn("House comment follow-up POST returned {}".format(comment_r.status_code))
+    def vote(self, path):
+        """
+        :return: the vote saved at *path*, if the working set has it and the file has not changed since, else None
+        :rtype: Vote
+        """
 
-        """FLAIR THE VOTE"""
+        path = os.path.normpath(path)
+        entry = self.votes.get(path)
+        if entry and os.path.exists(path) and os.path.getmtime(path) == entry[0]:
+            return entry[1]
+        return None
 
-        # Hardcoded values; if something flair-related breaks, it'll probably be this.
-        pass_flair_id = "72c210b8-eee9-11e6-a5ae-0eaf4dbf6b74"
-        fail_flair_id = "76cdad02-eee9-11e6-8acb-0e942a836e52"
-        furl = "https://oauth.reddit.com/r/535/api/selectflair"
-        f_params = {
-            'api_type': 'json',
-            'link': fullname,
-        }
+    def save(self):
+        """
+        Pickles the working set, keeping only the tracked bills and the votes posted within RECENT
+        :return: None
+        """
 
-        # Determine which flair to apply
+        cutoff = datetime.datetime.now() - self.RECENT
+        votes = {}
+        for path, (mtime, vote) in self.votes.iteritems():
+            if vote.fullname and self.recent(vote, cutoff):
+                votes[path] = (mtime, vote)
 
-        if len(roll['Yes']) > len(roll['No']):
-            f_params.update(flair_template_id=pass_flair_id)
+        repository = BillRepository._shared.get(BILL_DIRECTORY)
+        if repository is not None:
+            repository = copy.copy(repository)
+            repository.bills = {bill_id: bill for bill_id, bill in repository.bills.iteritems() if bill.tracking}
 
-        elif len(roll['No']) > len(roll['Yes']):
-            f_params.update(flair_template_id=fail_flair_id)
+        state = {'rosters': dict(Roster._loaded), 'members': MemberIndex._shared, 'bills': repository,
+                 'votes': votes, 'watermarks': self.watermarks}
+        with TRACER.span('WorkingSet.save', votes=len(votes)):
+            atomic_write(self.path, dumps((self.stamp(), state), HIGHEST_PROTOCOL))
 
-        # Apply the flair
-        flair_r = client.request('POST', furl, params=f_params)
+    def restore(self):
+        """
+        Puts a snapshot's contents back into the process-wide caches
+        :return: True if the snapshot was used, False if there was none or it was stale or unreadable
+        """
 
-        # Warn Chuck if he is an idiot
-        if flair_r.status_code != 200:
-            warn("Vote flair POST returned {}".format(flair_r.status_code))
+        if not os.path.exists(self.path):
+            return False
 
-        """Finally, remove the post so it only shows up in links"""
-        h_params = {
-            'id': fullname,
-            'spam': 'false'
-        }
-        hurl = 'https://oauth.reddit.com/api/remove'
+        try:
+            with TRACER.span('WorkingSet.restore'):
+                with open(self.path, 'rb') as snapshot_file:
+                    stamp, state = load(snapshot_file)
+        except Exception as e:  # Unpickling classes that have since changed can fail in many ways
+            warn("Ignoring unreadable snapshot {}: {}".format(self.path, e))
+            return False
+        if stamp != self.stamp():
+            print "Snapshot {} was written by other code; rebuilding".format(self.path)
+            return False
 
-        hide_r = client.request('POST', hurl, params=h_params)
+        # Roster.load and MemberIndex.shared check these against the CSVs before handing them out
+        Roster._loaded.update(state['rosters'])
+        MemberIndex._shared = state['members']
 
-        if hide_r.status_code != 200:
-            warn("Abnormal code {} for hide POST".format(hide_r.status_code))
+        repository = state['bills']
+        if repository is not None and os.path.isdir(repository.directory):
+            if os.path.getmtime(repository.directory) != repository.directory_mtime:
+                repository.refresh()  # Drops the bills whose files changed
+            BillRepository._shared[repository.directory] = repository
 
-        return fullname
+        self.votes = state['votes']
+        self.watermarks = state['watermarks']
+        return True
 
 
-class Committee:
-    def __init__(self):
-        pass
+WORKING_SET = WorkingSet()
 
 
-class RedditClient:
+class PublishJournal:
     """
-    Class representing a Reddit Client for the CongressionalRobot
+    A durable, write-ahead record of the Reddit calls made while publishing a single Vote or Bill.
+    Each step (submit, comments, flair, remove) is marked as begun before its request goes out and as done once Reddit
+    accepts it, so a job that dies partway through resumes at the first unfinished step instead of posting again.
+    A step whose request is waiting in a RedditClient's low-priority queue is also marked as queued, in this process
+    only, so publishing again before the queue drains does not send it twice.
     """
-    def __init__(self, usn, pw, limit=60, **agents_and_ids):
-        """"""
 
-        self.header = {}
-        self.header_exp = datetime.datetime.now()  # set as "expired" by default
-        self.authorize(usn, pw, **agents_and_ids)
+    _queued = set()  # (key, step) for every step waiting in a client's queue in this process
 
-        self.requests_made = 0  # Requests made in the past minute
-        self.limit = limit  # Reddit standard is 60 requests/min
-        self.requests_remaining = self.limit - self.requests_made
+    def __init__(self, key, directory='./journal'):
+        """
+        :param str key: a unique name for the thing being published, i.e. 'vote-115-1-house76' or 'bill-hr1628-115'
+        :param str directory: the folder the journal files are kept in
+        """
 
-        self.cycle_start = datetime.datetime.now()
+        self.key = key
+        self.path = os.path.join(directory, key + '.json')
+        self.steps = {}  # step name: {'state': 'begun' or 'done', 'result': whatever the step produced}
+        self.finished = False
 
-        # This Client needs to store its credentials to ensure constant service
-        self.username = usn
-        self.password = pw
+        if os.path.exists(self.path):
+            with open(self.path, 'r') as journal_file:
+                entry = json.load(journal_file)
+            self.steps = entry['steps']
+            self.finished = entry['finished']
 
-    def authorize(self, username, password, user_agent="python:CongressionalRobot:v0.0.1", app_id="BQ6EuAzmCd3JkQ",
-                  app_secret="0_DiQkyZssMwE2mw-nHP-aswWek"):
+    def exists(self):
+        """
+        :return: True if any step of this publication has ever been attempted
         """
-        Secure a temporary OAuth token from the Reddit API. This is good for 3600 seconds
-        :param app_id: Public ID for the Reddit app
-        :param username: Reddit account username
-        :param password: Reddit account password
-        :param user_agent: Name of the Reddit app, should be modeled for "CongressionalRobot"
-        :param app_secret: the secret key for the app. DO NOT SHARE THIS WITH ANYONE OUTSIDE OF THE 535 PROJECT
 
-        :return: a dictionary header for requests that includes the OAuth token
-        :rtype: dict
+        return bool(self.steps)
+
+    def done(self, step):
+        """
+        :return: True if Reddit has already accepted *step*
         """
 
-        url = "https://www.reddit.com/api/v1/access_token"
+        return self.steps.get(step, {}).get('state') == 'done'
 
-        client_auth = requests.auth.HTTPBasicAuth(app_id, app_secret)
-        post_data = {"grant_type": "password", "username": username, "password": password}
-        headers = {"User-Agent": "{} (by /u/{})".format(user_agent, username)}
-        response = requests.post(url, auth=client_auth, data=post_data,
-                                 headers=headers)
+    def result(self, step):
+        """
+        :return: whatever was recorded when *step* completed (i.e. the fullname for 'submit'), or None
+        """
 
-        # Sample response JSON:
-        #  {u'access_token': u'XXXXXXXXXXXXXXXXX', u'token_type': u'bearer', u'expires_in': 3600, u'scope': u'*'}
+        if self.done(step):
+            return self.steps[step]['result']
+        return None
 
-        self.header = {"Authorization": "bearer {}".format(response.json()["access_token"]),
-                  "User-Agent": "python:CongressionalRobot:v0.0.2 (by /u/theChuck-Truck)"}
+    def begun(self, step):
+        """
+        :return: True if *step* was attempted but never recorded as accepted. Its request may still have reached
+                 Reddit (the run died before hearing back, or Reddit answered with an error after acting on it).
+        """
 
-        self.header_exp = datetime.datetime.now() + datetime.timedelta(minutes=36)
+        return self.steps.get(step, {}).get('state') == 'begun'
 
-    def wait(self, seconds):
+    def begin(self, step):
         """
-        Waits a certain number of seconds then resets the request counter
-        :return:
+        Record that *step* is about to be attempted. Must be called before the request goes out.
         """
-        print "[CLIENT]: Waiting for next minute"
-        self.requests_made = 0  # Reset requests counter since we will wait out the rest of the period
-        self.requests_remaining = self.limit - self.requests_made
 
-        time.sleep(seconds)  # Wait that many seconds
+        if not self.done(step):
+            self.steps[step] = {'state': 'begun', 'result': None}
+            self._write()
 
-    def seconds_in_cycle(self):
+    def queued(self, step):
         """
-        Returns time (in seconds) remaining in the current cycle.
-        :return: seconds left
-        :rtype: int
+        :return: True if *step* is waiting in a client's queue in this process
         """
 
-        return (datetime.datetime.now() - self.cycle_start).seconds
+        return (self.key, step) in self._queued
 
-    def cycle_expired(self):
+    def queue(self, step):
         """
-        Checks if a cycle has passed since the last request
-        :return: True if cycle
+        Record that *step* is about to be queued at low priority. Its callback must complete() or release() it.
         """
 
-        return self.seconds_in_cycle > 60
+        self.begin(step)
+        self._queued.add((self.key, step))
 
-    def request(self, verb, url, **options):
+    def abandon(self, step):
         """
-        Makes a requests.get request with the argued options.
-        Note that the OAuth headers are automatically passed and don't need to be argued
-        :param verb: one of these RESTful verbs:
-                GET, PUT, POST, DELETE
-        :param url: the url to GET from
-        :param options: key/value pairs of requests
-        :return:
+        Forget an attempt at *step* that Reddit refused outright, so it is attempted again rather than recovered
         """
 
-        """Validate Inputs"""
-        verb = verb.upper()
-        assert verb in ['GET', 'POST', 'PUT', 'DELETE']
+        if self.begun(step):
+            del self.steps[step]
+            self._write()
 
-        """Check auth"""
-        if self.header_exp < (datetime.datetime.now() - datetime.timedelta(minutes=36)):
-            self.authorize(self.username, self.password)
+    def release(self, step):
+        """
+        Record that a queued *step* was sent and refused, so publishing again may retry it
+        """
+
+        self._queued.discard((self.key, step))
+
+    def complete(self, step, result=True):
+        """
+        Record that Reddit accepted *step*
+        """
 
-        """Check if the request count can be reset, or if we need to wait before making a call"""
+        self._queued.discard((self.key, step))
+        self.steps[step] = {'state': 'done', 'result': result}
+        self._write()
 
-        if self.cycle_expired():
-            self.cycle_start = datetime.datetime.now()
+    def finish(self, steps):
+        """
+        Mark the publication as finished if every step in *steps* is done.
+        :param list steps: the step names this publication needed
+        :return: True if the publication is now finished
+        """
 
-        elif self.requests_remaining == 0:
-            self.wait(self.seconds_in_cycle())
+        if all(self.done(step) for step in steps):
+            self.finished = True
+            self._write()
 
-        if verb == 'GET':
-            r = requests.get(url, headers=self.header, **options)
-        elif verb == 'POST':
-            r = requests.post(url, headers=self.header, **options)
-        elif verb == 'PUT':
-            r = requests.put(url, headers=self.header, **options)
-        elif verb == 'DELETE':
-            r = requests.delete(url, headers=self.header, **options)
+        return self.finished
 
-        else:
-            raise ValueError("Invalid verb argument: {}".format(verb))
+    def _write(self):
+        """
+        Atomically replace the journal file, so a crash mid-write never leaves a half-written journal behind.
+        """
 
-        return r
+        directory = os.path.dirname(self.path)
+        if not os.path.isdir(directory):
+            os.makedirs(directory)
+
+        atomic_write(self.path, json.dumps({'key': self.key, 'steps': self.steps, 'finished': self.finished}),
+                     sync=True)
 
 
 # ----------------------------------------------------------------------------------------------------------------------
@@ -0,0 +1,55 @@
+"""
+StartupBenchmark: times the cold start of a DailyVotes run that finds no new votes.
+Each sample is a fresh interpreter that imports FiveThreeFive, builds a RedditClient and filters a month of vote-list
+entries, which is everything DailyVotes does on a quiet day apart from the one ProPublica GET.
+Usage: python StartupBenchmark.py [samples]
+"""
+
+import subprocess
+import sys
+import time
+
+HEAVY_MODULES = ['requests', 'dateutil', 'deepdiff', 'configparser']
+
+COLD_START = '''
+import sys, datetime
+from FiveThreeFive import RedditClient, billtime
+client = RedditClient('usn', 'pwd')
+cutoff = datetime.datetime.now() - datetime.timedelta(days=1)
+listing = [dict(date='2017-03-0%d' % (i % 9 + 1), time='12:00:00') for i in range(200)]
+new_votes = [vote for vote in listing if billtime(vote, raw=True) > cutoff]
+print ','.join(name for name in {modules} if name in sys.modules)
+'''.format(modules=HEAVY_MODULES)
+
+
+def sample():
+    """
+    Runs one cold start in a new interpreter
+    :return: tuple of (wall-clock seconds, list of heavy modules that were imported)
+    """
+
+    start = time.time()
+    output = subprocess.check_output([sys.executable, '-c', COLD_START])
+    elapsed = time.time() - start
+
+    loaded = [name for name in output.strip().split(',') if name]
+    return elapsed, loaded
+
+
+def main(samples=10):
+    timings = []
+    loaded = []
+    for _ in range(samples):
+        elapsed, loaded = sample()
+        timings.append(elapsed)
+    timings.sort()
+
+    print "Cold start over {} runs:".format(samples)
+    print "  min    {:.3f}s".format(timings[0])
+    print "  median {:.3f}s".format(timings[len(timings) // 2])
+    print "  max    {:.3f}s".format(timings[-1])
+    print "Heavy modules imported: {}".format(', '.join(loaded) if loaded else 'none')
+
+
+if __name__ == "__main__":
+    main(int(sys.argv[1]) if len(sys.argv) > 1 else 10)
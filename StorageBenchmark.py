@@ -0,0 +1,115 @@
+"""
+StorageBenchmark: compares the on-disk formats of stored votes - bytes on disk and load throughput.
+Votes come from ./votes, or are synthesized from house.csv (one position per member) if there are none.
+Usage: python StorageBenchmark.py [synthetic votes]
+"""
+
+from FiveThreeFive import Vote, date_handler, encode_document
+import FiveThreeFive
+import csv
+import json
+import os
+import shutil
+import sys
+import tempfile
+import time
+
+VOTE_DIRECTORY = './votes'
+POSITIONS = ['Yes', 'No', 'Not Voting', 'Present']
+
+
+def stored_votes():
+    """
+    :return: the fields of every vote in VOTE_DIRECTORY
+    :rtype: list of dict
+    """
+
+    if not os.path.isdir(VOTE_DIRECTORY):
+        return []
+    return [Vote(file_path=os.path.join(VOTE_DIRECTORY, name)).fields()
+            for name in sorted(os.listdir(VOTE_DIRECTORY)) if name.endswith('.json')]
+
+
+def synthetic_votes(count):
+    """
+    :return: the fields of *count* House votes on which every member of house.csv took a position
+    :rtype: list of dict
+    """
+
+    with open('house.csv', 'rb') as csv_file:
+        members = list(csv.DictReader(csv_file))
+
+    votes = []
+    for i in range(count):
+        positions = [{'member_id': member['id'], 'name': '{} {}'.format(member['first_name'], member['last_name']),
+                      'party': member['party'], 'state': member['state'],
+                      'vote_position': POSITIONS[(i + j) % 7 % len(POSITIONS)], 'dw_nominate': None}
+                     for j, member in enumerate(members)]
+        votes.append({'id': str(i), 'chamber': 'house', 'congress': '115', 'session': 1, 'question': 'On Passage',
+                      'description': 'A bill to do something about item {}'.format(i), 'type': 'YEA-AND-NAY',
+                      'datetime': '2017-03-01T12:00:00', 'result': 'Passed', 'positions': positions,
+                      'republican_summary': {'yes': 200}, 'democratic_summary': {'no': 180},
+                      'independent_summary': {}, 'fullname': None, 'title': 'H.R.{}'.format(i),
+                      'bill_name': 'Bill {}'.format(i), 'json_file': './votes/house{}.json'.format(i)})
+    return votes
+
+
+def encode(fields, compression, packed):
+    """
+    :return: the bytes a vote is stored as in one format
+    """
+
+    if packed:
+        fields = dict(fields, positions=Vote.pack_positions(fields['positions']))
+    FiveThreeFive.STORAGE_COMPRESSION = compression
+    return encode_document(json.dumps(fields, default=date_handler))
+
+
+def measure(votes, compression, packed):
+    """
+    Writes every vote in one format, then loads them all back as Votes
+    :return: tuple of (bytes on disk, votes loaded per second)
+    """
+
+    directory = tempfile.mkdtemp()
+    try:
+        paths = []
+        size = 0
+        for i, fields in enumerate(votes):
+            data = encode(fields, compression, packed)
+            paths.append(os.path.join(directory, '{}.json'.format(i)))
+            with open(paths[-1], 'wb') as vote_file:
+                vote_file.write(data)
+            size += len(data)
+
+        start = time.time()
+        for path in paths:
+            Vote(file_path=path)
+        elapsed = time.time() - start
+    finally:
+        shutil.rmtree(directory)
+
+    return size, len(votes) / elapsed
+
+
+def main(count=200):
+    votes = stored_votes()
+    source = '{} stored votes'.format(len(votes))
+    if not votes:
+        votes = synthetic_votes(count)
+        source = '{} synthetic House votes'.format(count)
+
+    print "Storage of {}:".format(source)
+    baseline = None
+    for label, compression, packed in [('plain JSON (before)', None, False),
+                                       ('columnar JSON', None, True),
+                                       ('gzip', 6, False),
+                                       ('gzip + columnar (default)', 6, True)]:
+        size, throughput = measure(votes, compression, packed)
+        baseline = baseline or size
+        print "  {:<26} {:>10,} bytes ({:>5.1%})  {:>8,.0f} votes/s".format(label, size, float(size) / baseline,
+                                                                             throughput)
+
+
+if __name__ == "__main__":
+    main(int(sys.argv[1]) if len(sys.argv) > 1 else 200)
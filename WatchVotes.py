@@ -0,0 +1,185 @@
+"""
+WatchVotes: DailyVotes as a long-running daemon. Polls the House and Senate vote lists every couple of minutes while
+Congress is likely to be voting, and every half hour otherwise, posting each new roll call as soon as it is listed.
+The Reddit client and its token, the rosters, the caches and the HTTP connections all stay warm between polls.
+Progress is checkpointed to watch_state.json after every poll, so a restart picks up where the last run stopped.
+SIGTERM or SIGINT lets the current poll finish, writes everything out and exits.
+Usage: python WatchVotes.py [--trace trace.json]
+--trace records every poll and rewrites the trace file after each one, so it can be opened while the daemon runs.
+"""
+
+from FiveThreeFive import Vote, RedditClient, RESILIENCE, TRACER, WORKING_SET, ProPublicaError, CircuitOpenError, \
+    atomic_write, billtime, pp_key, reddit_credentials
+from DailyVotes import CHAMBERS, fetch_vote_list, new_votes, post_vote, finish
+import datetime
+import json
+import os
+import signal
+import sys
+import threading
+import traceback
+
+STATE_FILE = 'watch_state.json'
+FAST_INTERVAL = 120  # Seconds between polls during session hours
+SLOW_INTERVAL = 1800  # Seconds between polls outside session hours, or after a long quiet spell within them
+SESSION_DAYS = range(5)  # Monday to Friday
+SESSION_HOURS = (9, 23)  # U.S. Eastern; both chambers routinely vote into the night
+LOOKBACK = datetime.timedelta(days=1)  # How far back a chamber with no checkpoint looks for votes
+
+stopping = threading.Event()  # Set by SIGTERM/SIGINT
+
+
+def eastern_now():
+    """
+    :return: the current U.S. Eastern time, naive like ProPublica's vote dates and times
+    :rtype: datetime.datetime
+    """
+
+    from dateutil import tz
+
+    return datetime.datetime.now(tz.gettz('America/New_York')).replace(tzinfo=None)
+
+
+def poll_interval(now, quiet_polls):
+    """
+    :param datetime.datetime now: the current Eastern time
+    :param int quiet_polls: polls in a row that posted nothing
+    :return: seconds until the next poll: FAST_INTERVAL during session hours, doubled for every quiet poll (a recess,
+             a long debate) up to SLOW_INTERVAL, which is also the interval outside session hours
+    """
+
+    if now.weekday() in SESSION_DAYS and SESSION_HOURS[0] <= now.hour < SESSION_HOURS[1]:
+        return min(FAST_INTERVAL * 2 ** quiet_polls, SLOW_INTERVAL)
+    return SLOW_INTERVAL
+
+
+def load_state():
+    """
+    :return: the checkpoint: each chamber's watermark (the time of its latest handled roll call) in isoformat, the
+             number of votes posted so far and the time of the last poll
+    :rtype: dict
+    """
+
+    if os.path.exists(STATE_FILE):
+        with open(STATE_FILE, 'r') as state_file:
+            return json.load(state_file)
+    return {'watermarks': dict(WORKING_SET.watermarks), 'posted': 0, 'last_poll': None}
+
+
+def save_state(state):
+    atomic_write(STATE_FILE, json.dumps(state, indent=2))
+
+
+def months_since(watermark, now):
+    """
+    :return: generator of the first day of every month from *watermark*'s to *now*'s, since ProPublica lists votes by
+             month
+    """
+
+    month = watermark.replace(day=1, hour=0, minute=0, second=0, microsecond=0)
+    while month <= now:
+        yield month
+        month = (month + datetime.timedelta(days=32)).replace(day=1)
+
+
+def poll_chamber(chamber, watermark, alien):
+    """
+    Posts a chamber's roll calls that are newer than *watermark*, oldest first
+    :param str chamber: 'house' or 'senate'
+    :param datetime.datetime watermark: the time of the latest roll call already handled
+    :param RedditClient alien: the client to post with
+    :return: tuple of (the new watermark, the number of votes posted). A roll call that had to be deferred holds the
+             watermark back, so the next poll tries it again.
+    """
+
+    listing = []
+    for month in months_since(watermark, eastern_now()):
+        listing += fetch_vote_list(chamber, month)
+
+    posted = 0
+    handled = watermark
+    held_back = None  # Time of the earliest roll call that has to be tried again
+    for entry, vote in sorted(new_votes(chamber, listing, watermark), key=lambda pair: billtime(pair[0], raw=True)):
+        if stopping.is_set():
+            break
+        when = billtime(entry, raw=True)
+
+        try:
+            if vote is None:
+                print "Building {} Vote object".format(chamber)
+                vote = Vote(entry['vote_uri'], pp_key())
+            rendered = vote.render()
+        except (ProPublicaError, CircuitOpenError) as e:
+            RESILIENCE.defer('{} roll call {}'.format(chamber, entry['roll_call']), e)
+            held_back = held_back or when
+            continue
+
+        if post_vote(alien, vote, rendered):
+            posted += 1
+        else:
+            held_back = held_back or when
+        handled = max(handled, when)
+
+    if held_back is not None:
+        handled = min(handled, held_back - datetime.timedelta(seconds=1))
+    return handled, posted
+
+
+def main(trace_path=None):
+    from dateutil import parser
+
+    for signum in (signal.SIGTERM, signal.SIGINT):
+        signal.signal(signum, lambda signum, frame: stopping.set())
+
+    WORKING_SET.restore()
+    state = load_state()
+    alien = RedditClient(*reddit_credentials())
+    quiet_polls = 0
+
+    print "Watching the House and Senate vote lists"
+    while not stopping.is_set():
+        posted = 0
+        with TRACER.span('poll'):
+            for chamber in CHAMBERS:
+                watermark = state['watermarks'].get(chamber)
+                watermark = parser.parse(watermark) if watermark else eastern_now() - LOOKBACK
+                try:
+                    watermark, count = poll_chamber(chamber, watermark, alien)
+                except (ProPublicaError, CircuitOpenError) as e:
+                    RESILIENCE.defer('{} vote list'.format(chamber), e)
+                    continue
+                except Exception:
+                    traceback.print_exc()  # One bad poll should not take the daemon down
+                    continue
+                state['watermarks'][chamber] = watermark.isoformat()
+                posted += count
+
+            try:
+                finish(alien)
+            except Exception:
+                traceback.print_exc()  # Nor should one failed write-out or flush; queued requests stay queued
+
+        state['posted'] += posted
+        state['last_poll'] = eastern_now().isoformat()
+        save_state(state)
+        WORKING_SET.watermarks = state['watermarks']
+        if trace_path:
+            TRACER.export(trace_path)
+
+        quiet_polls = 0 if posted else quiet_polls + 1
+        stopping.wait(poll_interval(eastern_now(), quiet_polls))
+
+    WORKING_SET.save()  # So the next start is warm
+    print "Stopped after posting {} vote(s) in all".format(state['posted'])
+
+
+if __name__ == "__main__":
+    trace_path = sys.argv[sys.argv.index('--trace') + 1] if '--trace' in sys.argv else None
+    if trace_path:
+        TRACER.enable()
+    try:
+        main(trace_path)
+    finally:
+        if trace_path:
+            TRACER.export(trace_path)
+            print "Trace written to {}".format(trace_path)
@@ -0,0 +1,78 @@
+"""
+WeeklyDigest: posts a "how your delegation voted" summary for every state whose members voted in a week, built from
+the VoteDigest's running tallies rather than from the vote files.
+Usage: python WeeklyDigest.py [2017-W09] [--backfill]
+The week defaults to last week. --backfill first folds in any stored vote the digest has not counted yet, for votes
+saved before the digest existed.
+"""
+
+from FiveThreeFive import VoteDigest, PublishJournal, RedditClient, iter_stored_votes, reddit_credentials
+from warnings import warn
+import datetime
+import re
+import sys
+
+
+def post_state(alien, digest, state, week):
+    """
+    Submits a state's weekly post, unless an earlier run already did
+    :return: the post's fullname, or None if it failed
+    """
+
+    journal = PublishJournal('digest-{}-{}'.format(week, state))
+    if journal.finished:
+        return journal.result('submit')
+
+    rendered = digest.state_post(state, week)
+    params = {
+        "kind": "self",
+        "text": rendered['text'],
+        "sendreplies": "true",
+        "title": rendered['title'],
+        "sr": "535"
+    }
+
+    if journal.begun('submit'):
+        # The last attempt may have reached Reddit without us hearing back; never risk a second post
+        fullname = alien.recover_submission(journal, params['title'])
+        if fullname:
+            journal.finish(['submit'])
+        return fullname
+
+    journal.begin('submit')
+    post_r = alien.request('POST', "https://oauth.reddit.com/api/submit", params=params)
+    fn_search = re.search('comments\/([a-zA-Z0-9_]*)\/', post_r.text) if post_r.status_code == 200 else None
+    if not fn_search:
+        warn("{} digest post request returned {}".format(state, post_r.status_code))
+        if post_r.status_code < 500 and post_r.status_code != 200:
+            journal.abandon('submit')  # Refused outright, so nothing was posted and it is safe to try again
+        return None
+
+    fullname = 't3_' + fn_search.group(1)
+    journal.complete('submit', fullname)
+    journal.finish(['submit'])
+    return fullname
+
+
+def main(week, backfill=False):
+    digest = VoteDigest.shared()
+
+    if backfill:
+        added = digest.fold_many(iter_stored_votes())
+        print "Folded in {} stored votes".format(added)
+
+    states = digest.states(week)
+    if not states:
+        print "No votes in {}".format(week)
+        return
+
+    alien = RedditClient(*reddit_credentials())
+    for state in states:
+        print state, post_state(alien, digest, state, week)
+    alien.flush()
+
+
+if __name__ == "__main__":
+    weeks = [arg for arg in sys.argv[1:] if not arg.startswith('--')]
+    main(weeks[0] if weeks else VoteDigest.week_of(datetime.datetime.now() - datetime.timedelta(weeks=1)),
+         backfill='--backfill' in sys.argv)
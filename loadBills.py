@@ -1,13 +1,22 @@
-from FiveThreeFive import Bill, Vote, RedditClient, PP_KEY
-import requests
-import datetime
-import os
-test = []
-os.chdir('./bills')
-for f in [f for f in os.listdir(os.getcwd())]:
-    print f
-    test.append(Bill(file_path=f))
-
-for bill in test:
-    print 'this bill is at index ' + str(test.index(bill))
+"""
+loadBills: loads the saved bills through the BillRepository and lists them. Only tracked bills are read, unless --all.
+Usage: python loadBills.py [--all]
+"""
 
+from FiveThreeFive import BillRepository, WORKING_SET
+import sys
+
+
+def main(tracked_only=True):
+    WORKING_SET.restore()  # The tracked bills come back from the last snapshot instead of their files
+    repository = BillRepository.shared()
+    bills = repository.load(tracking=True if tracked_only else None)
+
+    for bill in bills:
+        print u'{} ({}): {}'.format(bill.bill_id, bill.status, bill.title).encode('utf-8')
+    print "Loaded {} of {} saved bills".format(len(bills), len(repository.entries))
+    WORKING_SET.save()
+
+
+if __name__ == "__main__":
+    main(tracked_only='--all' not in sys.argv)